@@ -4,6 +4,9 @@ Celery application setup for asynchronous task processing using Redis as broker
 import os
 from celery import Celery
 
+# Task result status for callers with no requests left; /task answers it with a 403
+TASK_STATUS_NO_REQUESTS_LEFT = "no_requests_left"
+
 celery_app = Celery(
     "worker",
     broker=os.getenv("REDIS_URL"),   # change for your environment
@@ -11,6 +14,56 @@ celery_app = Celery(
     include=["celery_task.task"]  # Ensure tasks are discovered
 )
 
+# Redis priorities run lowest-number-first; callers may pass priority= to apply_async
 celery_app.conf.task_routes = {
-    "celery_task.task.execute_prompt_task": {"queue": "prompts"},
+    "celery_task.task.execute_prompt_task": {"queue": "prompts", "priority": 3},
 }
+
+# Serialization and compression for broker messages and results.
+# Task payloads carry whole SQL scripts, so msgpack + zstd keeps Redis traffic small.
+# JSON stays accepted so messages queued before a rollout can still be consumed.
+celery_app.conf.update(
+    task_serializer="msgpack",
+    result_serializer="msgpack",
+    accept_content=["msgpack", "json"],
+    task_compression="zstd",
+    result_compression="zstd",
+)
+
+# Results are only read by the /task polling endpoint shortly after completion,
+# so expire them well before the one-day default to keep Redis memory bounded.
+celery_app.conf.result_expires = int(os.getenv("CELERY_RESULT_EXPIRES", str(6 * 60 * 60)))
+
+# Prompt tasks are I/O-bound (LLM calls and DB writes), so run them on threads in a
+# single process; the coroutines themselves share one event loop (core.async_runner).
+celery_app.conf.update(
+    worker_pool=os.getenv("CELERY_WORKER_POOL", "threads"),
+    worker_concurrency=int(os.getenv("CELERY_WORKER_CONCURRENCY", "100")),
+)
+
+# Broker connections are pooled and sized for the thread pool so concurrent publishes
+# reuse sockets instead of reconnecting; idle sockets are kept alive and health-checked.
+BROKER_POOL_LIMIT = int(os.getenv("CELERY_BROKER_POOL_LIMIT", "100"))
+
+# Prompt tasks run for seconds to minutes, so a worker only reserves the task it is
+# running and acknowledges it once done, letting idle workers drain the queue.
+celery_app.conf.update(
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+    broker_pool_limit=BROKER_POOL_LIMIT,
+    broker_connection_retry_on_startup=True,
+    broker_transport_options={
+        "priority_steps": list(range(4)),
+        "queue_order_strategy": "priority",
+        "max_connections": BROKER_POOL_LIMIT,
+        "socket_keepalive": True,
+        "health_check_interval": 30,
+    },
+)
+
+# Recycle worker children before xhtml2pdf/reportlab and SQLAlchemy caches bloat their RSS.
+# Only the prefork pool honours these, so they take effect when CELERY_WORKER_POOL=prefork.
+celery_app.conf.update(
+    worker_max_tasks_per_child=int(os.getenv("CELERY_MAX_TASKS_PER_CHILD", "200")),
+    worker_max_memory_per_child=int(os.getenv("CELERY_MAX_MEMORY_PER_CHILD_KB", str(512 * 1024))),
+)
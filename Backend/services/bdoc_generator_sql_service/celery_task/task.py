@@ -1,12 +1,23 @@
 """
 This module defines a Celery task for executing long-running prompt operations asynchronously.
 """
-from celery_task.celery_app import celery_app
+from celery.signals import worker_init
+from celery_task.celery_app import celery_app, TASK_STATUS_NO_REQUESTS_LEFT
 from core.prompt_wrapper import PromptWrapper
+from core.database_connection import AsyncSQLAlchemySingleton
 from core.custom_logger import CustomLogger
 
 logger = CustomLogger.setup_logger(__name__)
 
+@worker_init.connect
+def init_database_engine(**_) -> None:
+    """
+    Create the database engine once when the worker boots, so tasks reuse the
+    same engine and pool instead of receiving a handle in their payload.
+    The engine connects lazily, so no connection is opened before the pool starts.
+    """
+    AsyncSQLAlchemySingleton().init_engine()
+
 @celery_app.task(name="celery_task.task.execute_prompt_task", bind=True)
 def execute_prompt_task(
         _,
@@ -30,6 +41,10 @@ def execute_prompt_task(
 
         file_path = prompt_service.execute_sync() # Celery expects sync call
 
+        # Return a serializable marker; the API turns it into the HTTP response
+        if file_path is None:
+            return {"status": TASK_STATUS_NO_REQUESTS_LEFT}
+
         return {"status": "completed", "file_path": file_path}
 
     except Exception as e:
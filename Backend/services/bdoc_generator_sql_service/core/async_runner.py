@@ -0,0 +1,56 @@
+"""
+This module provides a singleton that owns a long-lived asyncio event loop
+running in a background thread.
+Synchronous callers, such as Celery worker threads, submit coroutines to it
+so that loop-bound resources (database connection pool, LLM HTTP client,
+semaphores) are shared across tasks instead of being rebuilt on a new loop per task.
+"""
+import asyncio
+import threading
+from typing import Any, Coroutine, TypeVar
+
+T = TypeVar("T")
+
+class AsyncLoopRunner:
+    """
+    Singleton class for running coroutines on a shared background event loop.
+    Usage:
+        runner = AsyncLoopRunner()
+        result = runner.run(some_coroutine())
+    """
+    _instance = None
+    _lock = threading.Lock()  # Lock for thread-safe singleton instantiation
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:  # Double-check
+                    instance = super().__new__(cls)
+                    instance._loop = asyncio.new_event_loop()
+                    instance._thread = threading.Thread(
+                        target=instance._run_loop,
+                        name="async-loop-runner",
+                        daemon=True
+                    )
+                    instance._thread.start()
+                    cls._instance = instance
+        return cls._instance
+
+    def _run_loop(self) -> None:
+        """
+        Runs the event loop forever in the background thread.
+        """
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def run(self, coro: Coroutine[Any, Any, T]) -> T:
+        """
+        Runs a coroutine on the shared event loop and blocks until it completes.
+
+        Args:
+            coro (Coroutine): The coroutine to execute.
+
+        Returns:
+            T: The result of the coroutine.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
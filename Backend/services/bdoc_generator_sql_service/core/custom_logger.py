@@ -3,14 +3,89 @@ Custom logger setup with file and console handlers, including SQLAlchemy engine
 """
 import logging
 import os
-import datetime
+from logging.handlers import RotatingFileHandler
 
 class CustomLogger:
     """
     Custom Logger class to set up logging with file and console handlers.
+    Handlers are created once per process and shared by every logger,
+    so repeated setup calls neither open new log files nor stack handlers.
     """
+    _formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    _file_handlers: dict[str, RotatingFileHandler] = {}
+    _console_handler: logging.Handler = None
+
     @staticmethod
-    def setup_logger(name: str, logs_dir: str = None) -> logging.Logger:
+    def _get_file_path(logs_dir: str) -> str:
+        """
+        Returns the log file path for this process. The API and worker containers share
+        the logs volume and RotatingFileHandler is not safe across processes, so each
+        process writes to its own file, named after LOG_FILE_NAME and the process ID.
+
+        Args:
+            logs_dir (str): Directory to store log files.
+
+        Returns:
+            str: Path of this process's log file.
+        """
+        stem, ext = os.path.splitext(os.getenv("LOG_FILE_NAME", "bdoc_generator_sql.log"))
+        return os.path.join(logs_dir, f"{stem}.{os.getpid()}{ext or '.log'}")
+
+    @classmethod
+    def _reopen_file_handlers(cls) -> None:
+        """
+        Points the inherited file handlers of a forked child, such as a prefork
+        Celery worker, at the child's own log file.
+        """
+        for logs_dir, file_handler in cls._file_handlers.items():
+            file_handler.close()
+            file_handler.baseFilename = os.path.abspath(cls._get_file_path(logs_dir))
+
+    @classmethod
+    def _get_file_handler(cls, logs_dir: str) -> logging.Handler:
+        """
+        Returns the shared rotating file handler for a logs directory,
+        creating it and attaching it to the SQLAlchemy engine logger on first use.
+
+        Args:
+            logs_dir (str): Directory to store log files.
+
+        Returns:
+            logging.Handler: Rotating file handler writing to this process's log file.
+        """
+        file_handler = cls._file_handlers.get(logs_dir)
+        if file_handler is not None:
+            return file_handler
+
+        # Ensure logs directory exists
+        os.makedirs(logs_dir, exist_ok=True)
+
+        # File handler
+        file_handler = RotatingFileHandler(
+            cls._get_file_path(logs_dir),
+            maxBytes=10 * 1024 * 1024,
+            backupCount=5)
+        file_handler.setLevel(logging.DEBUG)
+        file_handler.setFormatter(cls._formatter)
+        cls._file_handlers[logs_dir] = file_handler
+
+        # Console handler
+        if cls._console_handler is None:
+            cls._console_handler = logging.StreamHandler()
+            cls._console_handler.setLevel(logging.DEBUG)
+            cls._console_handler.setFormatter(cls._formatter)
+
+        # Configure SQLAlchemy logger
+        sqlalchemy_logger = logging.getLogger("sqlalchemy.engine")
+        sqlalchemy_logger.setLevel(logging.INFO)
+        sqlalchemy_logger.addHandler(file_handler)
+        if cls._console_handler not in sqlalchemy_logger.handlers:
+            sqlalchemy_logger.addHandler(cls._console_handler)
+
+        return file_handler
+
+    @classmethod
+    def setup_logger(cls, name: str, logs_dir: str = None) -> logging.Logger:
         """
         Set up a logger with file + console handlers.
         Also configures SQLAlchemy engine logger to use the same handlers.
@@ -29,8 +104,6 @@ class CustomLogger:
         if logger.handlers:
             return logger
 
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-
         # Default logs directory
         if logs_dir is None:
             logs_dir = os.path.join(
@@ -38,27 +111,10 @@ class CustomLogger:
                     os.path.dirname(__file__)
                 ), 'logs')
 
-        # Ensure logs directory exists
-        os.makedirs(logs_dir, exist_ok=True)
-
-        # File handler
-        log_file_name = f"{datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.log"
-        file_path = os.path.join(logs_dir, log_file_name)
-        file_handler = logging.FileHandler(file_path)
-        file_handler.setLevel(logging.DEBUG)
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-
-        # Console handler
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.DEBUG)
-        console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
-
-        # Configure SQLAlchemy logger
-        sqlalchemy_logger = logging.getLogger("sqlalchemy.engine")
-        sqlalchemy_logger.setLevel(logging.INFO)
-        sqlalchemy_logger.addHandler(file_handler)
-        sqlalchemy_logger.addHandler(console_handler)
+        logger.addHandler(cls._get_file_handler(logs_dir))
+        logger.addHandler(cls._console_handler)
 
         return logger
+
+# Forked children reopen the shared handlers on their own files
+os.register_at_fork(after_in_child=CustomLogger._reopen_file_handlers)
@@ -5,13 +5,18 @@ It provides methods to initialize the database engine, create a session,
 and create the schema if it does not exist.
 """
 import os
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.exc import ProgrammingError
-from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy import inspect, select
 from models.base import Base
 from models.business import Businesses
 
+# Connection pool settings; connections are reused across requests instead of
+# paying the connect and auth handshake every time
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+
 class AsyncSQLAlchemySingleton:
     """
     Singleton class for managing an asynchronous SQLAlchemy database connection.
@@ -39,10 +44,18 @@ class AsyncSQLAlchemySingleton:
             db_url (str): The database URL for the SQLAlchemy engine.
         """
         if not self._engine:
-            self._engine = create_async_engine(self._db_url, echo=False, future=True)
-            self._session_local = sessionmaker(
+            self._engine = create_async_engine(
+                self._db_url,
+                echo=False,
+                future=True,
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                pool_recycle=DB_POOL_RECYCLE,
+                pool_pre_ping=True,
+                pool_timeout=DB_POOL_TIMEOUT,
+            )
+            self._session_local = async_sessionmaker(
                 bind=self._engine,
-                class_=AsyncSession,
                 expire_on_commit=False,
             )
 
@@ -58,15 +71,18 @@ class AsyncSQLAlchemySingleton:
     async def create_schema_if_not_exists(self):
         """
         Creates the database schema if it does not already exist.
-        This method checks for the existence of the 'users' table
+        This method checks for the existence of the 'businesses' table
         and creates all tables if it does not exist.
         """
-        try:
-            async with self._engine.begin() as conn:
-                await conn.execute(select(Businesses))
-        except ProgrammingError:
+        async with self._engine.begin() as conn:
+
+            # Check the catalog for the table instead of selecting from it
+            table_exists = await conn.run_sync(
+                lambda sync_conn: inspect(sync_conn).has_table(Businesses.__tablename__)
+            )
+
             # If the table does not exist, create all tables
-            async with self._engine.begin() as conn:
+            if not table_exists:
                 await conn.run_sync(Base.metadata.create_all)
 
     async def seed_business_domains(self) -> bool:
@@ -18,16 +18,16 @@ class DatabaseWrapper:
     or IP address counts and updating the database after prompt execution.
     Usage:
         db_wrapper = DatabaseWrapper(db_connection, logger)
-        count = await db_wrapper.get_count_for_user(user_id)
-        await db_wrapper.update_database_after_execution(file_path, request_id, user_id)
+        await db_wrapper.update_count_for_user_from_request(request, new_count)
+        business_names = await db_wrapper.get_all_business()
     """
     def __init__(
             self,
             db_connection: AsyncSQLAlchemySingleton,
-            logger: Optional[Logger] = CustomLogger.setup_logger(__name__)
+            logger: Optional[Logger] = None
         ):
         self._db = db_connection
-        self.logger = logger
+        self.logger = logger or CustomLogger.setup_logger(__name__)
         self.jwt_lib = JWTLibrary(logger=self.logger)
         self.db_service = DBService(db_connection=self._db, logger=self.logger)
 
@@ -40,8 +40,11 @@ class DatabaseWrapper:
         Args:
             request (Request): The request object containing user information.
             new_count (int): The new count to be set for the user.
+        Raises:
+            HTTPException: 401 error for a missing, invalid or expired access token
+            HTTPException: 404 error when the user has no request quota yet
         Returns:
-            bool: True if the count was updated successfully, False otherwise.
+            bool: True if the count was updated successfully.
         """
         # Validate the request
         if not request.cookies.get("access_token"):
@@ -51,13 +54,18 @@ class DatabaseWrapper:
         user_id = self.jwt_lib.get_user_id_from_jwt(token=request.cookies.get("access_token"))
 
         # Validate the user ID
-        await self.db_service.update_count_for_user(
+        if user_id is None:
+            raise HTTPException(status_code=401, detail="Unauthorized: Invalid access token.")
+
+        updated = await self.db_service.update_count_for_user(
             user_id=user_id,
             new_count=new_count
         )
+        if not updated:
+            raise HTTPException(status_code=404, detail="User not found.")
 
         # Log the update
-        self.logger.debug(f"Updated count for user {user_id} to {new_count}")
+        self.logger.debug("Updated count for user %s to %s", user_id, new_count)
 
         return True
 
@@ -1,12 +1,17 @@
 """
 This module defines the DBService class to manage database operations
 related to user capacity, IPs, SQL scripts, PDFs, and requests.
-It provides methods to get counts for users and IPs, update counts,
-insert new records, and retrieve specific data from the database.
+It provides methods to reserve and refund request counts for users and IPs,
+record completed prompts, and retrieve specific data from the database.
 """
-from typing import Optional
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
 from logging import Logger
-from sqlalchemy import select, update
+from cachetools import TTLCache
+from sqlalchemy import select, update, insert, bindparam, Integer, String
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from core.custom_logger import CustomLogger
 from core.database_connection import AsyncSQLAlchemySingleton
 from models.ips import IPs
@@ -16,50 +21,169 @@ from models.pdf import PDFs
 from models.requests import Requests
 from models.business import Businesses
 
+# Statements for hot lookups are built once and reused with bound parameters,
+# so each call skips constructing the expression and hits the compiled cache.
+_UPDATE_COUNT_FOR_USER = (
+    update(UserCapacity)
+    .where(UserCapacity.user_id == bindparam("b_user_id"))
+    .values(capacity=bindparam("new_count"))
+)
+
+# Reserving a request is a single upsert: a new user or IP starts at its default count
+# minus the reserved request, and an existing row is decremented only while above zero.
+# No row comes back when nothing is left. Built on the Core tables, as bound parameters
+# would otherwise send an ORM insert down the bulk-insert path.
+_IPS = IPs.__table__
+_USER_CAPACITY = UserCapacity.__table__
+_RESERVE_REQUEST_FOR_IP = (
+    pg_insert(_IPS)
+    .values(
+        ip_address=bindparam("ip_address", type_=String),
+        count=_IPS.c.count.default.arg - 1
+    )
+    .on_conflict_do_update(
+        index_elements=[_IPS.c.ip_address],
+        set_={"count": _IPS.c.count - 1},
+        where=_IPS.c.count > 0
+    )
+    .returning(_IPS.c.count)
+)
+_RESERVE_REQUEST_FOR_USER = (
+    pg_insert(_USER_CAPACITY)
+    .values(
+        user_id=bindparam("user_id", type_=String),
+        capacity=_USER_CAPACITY.c.capacity.default.arg - 1
+    )
+    .on_conflict_do_update(
+        index_elements=[_USER_CAPACITY.c.user_id],
+        set_={"capacity": _USER_CAPACITY.c.capacity - 1},
+        where=_USER_CAPACITY.c.capacity > 0
+    )
+    .returning(_USER_CAPACITY.c.capacity)
+)
+_REFUND_REQUEST_FOR_IP = (
+    update(IPs)
+    .where(IPs.ip_address == bindparam("b_ip_address"))
+    .values(count=IPs.count + 1)
+)
+_REFUND_REQUEST_FOR_USER = (
+    update(UserCapacity)
+    .where(UserCapacity.user_id == bindparam("b_user_id"))
+    .values(capacity=UserCapacity.capacity + 1)
+)
+_GET_BUSINESS_ID_BY_NAME = select(Businesses.business_id).where(
+    Businesses.name == bindparam("business_name")
+)
+_GET_PDF_FILE_PATH_BY_REQUEST_ID = (
+    select(PDFs.file_path)
+    .join(Requests, Requests.pdf_id == PDFs.pdf_id)
+    .where(Requests.request_id == bindparam("request_id"))
+)
+_GET_ALL_BUSINESS_NAMES = select(Businesses.name)
+
+# SQL script, PDF and request rows are chained through data-modifying CTEs,
+# so the whole record is written in one round trip and returns the new PDF ID.
+# Built on the Core tables: an ORM insert executed with parameters runs as a bulk insert.
+_SQLS = SQLs.__table__
+_PDFS = PDFs.__table__
+_REQUESTS = Requests.__table__
+_NEW_SQL = (
+    insert(_SQLS)
+    .values(
+        script_file_path=bindparam("sql_script_path", type_=String),
+        business_id=bindparam("business_id", type_=Integer)
+    )
+    .returning(_SQLS.c.sql_id)
+    .cte("new_sql")
+)
+_NEW_PDF = (
+    insert(_PDFS)
+    .from_select(
+        [_PDFS.c.file_path, _PDFS.c.sql_id],
+        select(bindparam("pdf_file_path", type_=String), _NEW_SQL.c.sql_id)
+    )
+    .returning(_PDFS.c.pdf_id)
+    .cte("new_pdf")
+)
+_INSERT_PROMPT_RESULT = (
+    insert(_REQUESTS)
+    .from_select(
+        [_REQUESTS.c.request_id, _REQUESTS.c.pdf_id, _REQUESTS.c.user_id, _REQUESTS.c.ip_address],
+        select(
+            bindparam("request_id", type_=String),
+            _NEW_PDF.c.pdf_id,
+            bindparam("user_id", type_=String),
+            bindparam("ip_address", type_=String)
+        )
+    )
+    .returning(_REQUESTS.c.pdf_id)
+)
+
+# Seconds that cached business names and IDs are served before the database is read again
+BUSINESS_CACHE_TTL = int(os.getenv("BUSINESS_CACHE_TTL", "300"))
+
 class DBService:
     """
     Count Service class offers count values.
     Usage:
-        count_service_obj = CountService(db_connection, jwt_auth)
-        count_for_user = count_service_obj.get_count_for_user(token)
-        count_for_ip = count_service_obj.get_count_for_ip(ip_address)
+        count_service_obj = DBService(db_connection, logger)
+        count_left = await count_service_obj.reserve_request_for_ip(ip_address)
+
+        # Share one session across several calls
+        async with count_service_obj.session_scope():
+            pdf_path = await count_service_obj.get_pdf_path_by_request_id(request_id)
+            count_left = await count_service_obj.reserve_request_for_user(user_id)
     """
+    # Business names only change when the seed data does, so they are cached per process.
+    # Seeding only adds missing rows: unknown IDs are never cached and the name list
+    # expires after BUSINESS_CACHE_TTL, so new businesses are picked up without invalidation.
+    _business_names_cache: TTLCache = TTLCache(maxsize=1, ttl=BUSINESS_CACHE_TTL)
+    _business_id_cache: TTLCache = TTLCache(maxsize=256, ttl=BUSINESS_CACHE_TTL)
+
     def __init__(self,
                 db_connection: AsyncSQLAlchemySingleton,
-                logger: Optional[Logger] = CustomLogger.setup_logger(__name__)
+                logger: Optional[Logger] = None,
+                session: Optional[AsyncSession] = None
             ):
         self._db = db_connection
-        self.logger = logger
+        self.logger = logger or CustomLogger.setup_logger(__name__)
+        self._session = session
 
-    async def get_count_for_user(self, user_id: str) -> Optional[int]:
+    @asynccontextmanager
+    async def _get_session(self) -> AsyncIterator[AsyncSession]:
         """
-        Returns Number of Requests Left for User
-
-        Args:
-            token (dict): JWT Token contianing user info
+        Yields the bound session if there is one, otherwise opens a new session
+        that is closed when the block exits.
 
-        Returns:
-            int: Number of Requests Left
+        Yields:
+            AsyncSession: The session to run the statement on.
         """
-        async with self._db.get_session() as session:
-            sql_stmt = select(UserCapacity.capacity).where(UserCapacity.user_id == user_id)
-            result = await session.execute(sql_stmt)
-        return result.scalar_one_or_none()
-
-    async def get_count_for_ip(self, ip_address: str) -> Optional[int]:
+        if self._session is not None:
+            yield self._session
+        else:
+            async with self._db.get_session() as session:
+                yield session
+
+    @asynccontextmanager
+    async def session_scope(self) -> AsyncIterator[AsyncSession]:
         """
-        Returns Number of Requests Left for that IP
+        Binds a single session to this service for the duration of the block,
+        so consecutive calls reuse it instead of creating a session per query.
+        If a session is already bound, it is reused as is.
 
-        Args:
-            ip_address (str): IP address for the user
-
-        Returns:
-            int: Number of Requests Left
+        Yields:
+            AsyncSession: The bound session.
         """
+        if self._session is not None:
+            yield self._session
+            return
+
         async with self._db.get_session() as session:
-            sql_stmt = select(IPs.count).where(IPs.ip_address == ip_address)
-            result = await session.execute(sql_stmt)
-        return result.scalar_one_or_none()
+            self._session = session
+            try:
+                yield session
+            finally:
+                self._session = None
 
     async def update_count_for_user(self, user_id: str, new_count: int) -> bool:
         """
@@ -72,145 +196,107 @@ class DBService:
         Returns:
             bool: True for Success, False for Failure
         """
-        async with self._db.get_session() as session:
-            sql_stmt = (
-                update(UserCapacity)
-                .where(UserCapacity.user_id == user_id)
-                .values(capacity=new_count)
+        async with self._get_session() as session:
+            result = await session.execute(
+                _UPDATE_COUNT_FOR_USER,
+                {"b_user_id": user_id, "new_count": new_count}
             )
-            result = await session.execute(sql_stmt)
             await session.commit()
         return result.rowcount > 0
 
-    async def update_count_for_ip(self, ip_address: str, new_count: int) -> bool:
+    async def reserve_request_for_ip(self, ip_address: str) -> Optional[int]:
         """
-        Updating Count for IP
+        Reserves one request for an IP in a single upsert, creating the IP
+        with its default count if it is new.
 
         Args:
             ip_address (str): IP Address of User
-            new_count (int): Number of Requests Remaining
 
         Returns:
-            bool: True for Success, False for Failure
+            Optional[int]: Number of Requests Remaining after the reservation,
+                or None if the IP has no requests left.
         """
-        async with self._db.get_session() as session:
-            sql_stmt = (
-                update(IPs)
-                .where(IPs.ip_address == ip_address)
-                .values(count=new_count)
-            )
-            result = await session.execute(sql_stmt)
-            await session.commit()
-        return result.rowcount > 0
-
-    async def inset_new_ip(self, ip_address: str) -> int:
-        """
-        Inserts a new record for the given IP address into the database.
-        This method creates a new IPs entry with the provided IP address
-        and commits it to the database asynchronously.
-
-        Args:
-            ip_address (str): The IP address to be inserted into the database.
-
-        Raises:
-            Exception: If there is an error during database insertion or commit.
-
-        Returns:
-            int: The count of requests left for the newly inserted IP address.
-        """
-        async with self._db.get_session() as session:
-            new_ip = IPs(ip_address=ip_address)
-            session.add(new_ip)
+        async with self._get_session() as session:
+            result = await session.execute(_RESERVE_REQUEST_FOR_IP, {"ip_address": ip_address})
+            new_count = result.scalar_one_or_none()
             await session.commit()
-            await session.refresh(new_ip)
-        return new_ip.count
+        return new_count
 
-    async def insert_new_user(self, user_id: str) -> int:
+    async def reserve_request_for_user(self, user_id: str) -> Optional[int]:
         """
-        Inserts a new user record into the UserCapacity table.
+        Reserves one request for a user in a single upsert, creating the user
+        with its default capacity if it is new.
 
         Args:
-            user_id (str): The unique identifier for the user.
-
-        Returns:
-            int: The initial capacity for the newly inserted user.
-        """
-        async with self._db.get_session() as session:
-            new_user = UserCapacity(
-                user_id=user_id
-            )
-            session.add(new_user)
-            await session.commit()
-            await session.refresh(new_user)
-        return new_user.capacity
+            user_id (str): Combination of Name and Email
 
-    async def insert_sql_script(self, sql_script_path: str, business_id: int) -> int:
-        """
-        Inserts a new SQL script into the SQLs table.
-        Args:
-            sql_script (str): The SQL script to be inserted.
-            business_id (int): The ID of the business associated with the SQL script.
         Returns:
-            int: The ID of the newly inserted SQL script record.
+            Optional[int]: Number of Requests Remaining after the reservation,
+                or None if the user has no requests left.
         """
-        async with self._db.get_session() as session:
-            new_sql = SQLs(
-                script_file_path=sql_script_path,
-                business_id=business_id
-            )
-            session.add(new_sql)
+        async with self._get_session() as session:
+            result = await session.execute(_RESERVE_REQUEST_FOR_USER, {"user_id": user_id})
+            new_count = result.scalar_one_or_none()
             await session.commit()
-            await session.refresh(new_sql)
-        return new_sql.sql_id
+        return new_count
 
-    async def insert_pdf_file(self, file_path: str, sql_id: int) -> int:
+    async def refund_request(
+            self,
+            user_id: Optional[str] = None,
+            ip_address: Optional[str] = None) -> None:
         """
-        Inserts a new PDF file record into the PDFs table.
+        Gives back a reserved request to the user, or the IP address when there is no user,
+        after the prompt it was reserved for has failed.
 
         Args:
-            file_path (str): The file path of the PDF.
-            sql_id (int): The ID of the associated SQL script.
-        Returns:
-            int: The ID of the newly inserted PDF record.
+            user_id (str, optional): Combination of Name and Email
+            ip_address (str, optional): IP Address of User
         """
-        async with self._db.get_session() as session:
-            new_pdf = PDFs(
-                file_path=file_path,
-                sql_id=sql_id
-            )
-            session.add(new_pdf)
+        async with self._get_session() as session:
+            if user_id:
+                await session.execute(_REFUND_REQUEST_FOR_USER, {"b_user_id": user_id})
+            else:
+                await session.execute(_REFUND_REQUEST_FOR_IP, {"b_ip_address": ip_address})
             await session.commit()
-            await session.refresh(new_pdf)
-        return new_pdf.pdf_id
 
-    async def insert_new_request(
+    async def record_prompt_result(
             self,
+            sql_script_path: str,
+            business_id: int,
+            pdf_file_path: str,
             request_id: str,
             user_id: str = None,
-            ip_address: str = None,
-            pdf_id: int = None) -> bool:
+            ip_address: str = None) -> int:
         """
-        Inserts a new request record into the Requests table.
+        Inserts the SQL script, PDF file and request records for a completed prompt
+        in a single statement. The request itself was already counted when it was reserved.
 
         Args:
+            sql_script_path (str): The file path of the SQL script.
+            business_id (int): The ID of the business associated with the SQL script.
+            pdf_file_path (str): The file path of the PDF.
             request_id (str): The unique identifier for the request.
             user_id (str, optional): The ID of the user making the request.
             ip_address (str, optional): The IP address of the user making the request.
-            pdf_id (int, optional): The ID of the associated PDF file.
-        
+
         Returns:
-            bool: Returns True if the insertion and commit were successful.
+            int: The ID of the newly inserted PDF record.
         """
-        async with self._db.get_session() as session:
-            sql_stmt = Requests(
-                request_id=request_id,
-                pdf_id=pdf_id,
-                user_id=user_id,
-                ip_address=ip_address
+        async with self._get_session() as session:
+            result = await session.execute(
+                _INSERT_PROMPT_RESULT,
+                {
+                    "sql_script_path": sql_script_path,
+                    "business_id": business_id,
+                    "pdf_file_path": pdf_file_path,
+                    "request_id": request_id,
+                    "user_id": user_id,
+                    "ip_address": ip_address
+                }
             )
-            session.add(sql_stmt)
+            pdf_id = result.scalar_one()
             await session.commit()
-        return True
+        return pdf_id
 
     async def get_business_id_from_business_name(self, business_name: str) -> Optional[int]:
         """
@@ -221,40 +307,35 @@ class DBService:
         Returns:
             Optional[int]: The ID of the business if found, otherwise None.
         """
-        async with self._db.get_session() as session:
-            sql_stmt = select(Businesses.business_id).where(
-                Businesses.name == business_name
-            )
-            result = await session.execute(sql_stmt)
-        return result.scalar_one_or_none()
-
-    async def get_request_by_request_id(self, request_id: str) -> Optional[Requests]:
+        business_id = self._business_id_cache.get(business_name)
+        if business_id is None:
+            async with self._get_session() as session:
+                result = await session.execute(
+                    _GET_BUSINESS_ID_BY_NAME,
+                    {"business_name": business_name}
+                )
+            business_id = result.scalar_one_or_none()
+
+            # Unknown names are not cached so a newly seeded business is picked up
+            if business_id is not None:
+                self._business_id_cache[business_name] = business_id
+        return business_id
+
+    async def get_pdf_path_by_request_id(self, request_id: str) -> Optional[str]:
         """
-        Retrieves a request record by its request ID.
+        Retrieves the file path of the PDF generated for a request
+        in a single joined query.
 
         Args:
             request_id (str): The unique identifier for the request.
-        
-        Returns:
-            Optional[Requests]: The request record if found, otherwise None.
-        """
-        async with self._db.get_session() as session:
-            sql_stmt = select(Requests).where(Requests.request_id == request_id)
-            result = await session.execute(sql_stmt)
-        return result.scalar_one_or_none()
-
-    async def get_pdf_file_path_by_pdf_id(self, pdf_id: int) -> Optional[str]:
-        """
-        Retrieves the file path of a PDF by its ID.
-
-        Args:
-            pdf_id (int): The ID of the PDF file.
         Returns:
-            Optional[str]: The file path of the PDF if found, otherwise None.
+            Optional[str]: The file path of the PDF if the request exists, otherwise None.
         """
-        async with self._db.get_session() as session:
-            sql_stmt = select(PDFs.file_path).where(PDFs.pdf_id == pdf_id)
-            result = await session.execute(sql_stmt)
+        async with self._get_session() as session:
+            result = await session.execute(
+                _GET_PDF_FILE_PATH_BY_REQUEST_ID,
+                {"request_id": request_id}
+            )
         return result.scalar_one_or_none()
 
     async def get_all_business(self) -> list[str]:
@@ -264,7 +345,12 @@ class DBService:
         Returns:
             list[str]: List of business name in DB
         """
-        async with self._db.get_session() as session:
-            sql_stmt = select(Businesses.name)
-            result = await session.execute(sql_stmt)
-        return result.scalars().all()
+        business_names = self._business_names_cache.get("names")
+        if business_names is None:
+            async with self._get_session() as session:
+                result = await session.stream_scalars(_GET_ALL_BUSINESS_NAMES)
+                business_names = [name async for name in result]
+            self._business_names_cache["names"] = business_names
+
+        # Return a copy so callers cannot mutate the cached list
+        return list(business_names)
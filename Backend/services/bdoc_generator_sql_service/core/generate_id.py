@@ -6,10 +6,38 @@ a default placeholder is used. This is useful for systems that require
 anonymized or consistent user identification.
 """
 import hashlib
+from functools import lru_cache
 from typing import Optional
 from logging import Logger
 from core.custom_logger import CustomLogger
 
+# Placeholder used when the OAuth provider does not return an email
+DEFAULT_EMAIL = "not_found@not_found.com"
+
+# Characters str.strip() removes from ASCII text, so stripping bytes gives the same result
+ASCII_WHITESPACE = b" \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f"
+
+@lru_cache(maxsize=4096)
+def _hash_user_id(name: bytes, email: bytes) -> str:
+    """
+    Hashes an already normalized name and email pair.
+    Memoized because the same logged-in users are hashed repeatedly per process.
+
+    Args:
+        name (bytes): Lower-cased, stripped, UTF-8 encoded name of User
+        email (bytes): Lower-cased, stripped, UTF-8 encoded email of User
+
+    Returns:
+        str: Hash Combination of both
+    """
+    # SHA-256 must stay: user IDs are stored keys shared with user_service,
+    # and hashlib's OpenSSL backend already uses SHA-NI where the CPU has it.
+    # Feed the parts to the hash directly rather than building a joined string first.
+    digest = hashlib.sha256(name)
+    digest.update(b"|")
+    digest.update(email)
+    return digest.hexdigest()
+
 class GenerateId:
     """
     GenerateUserId is a utility class for generating consistent and unique user identifiers.
@@ -42,6 +70,16 @@ class GenerateId:
         Returns:
             str: Hash Combination of both
         """
-        email = email or "not_found@not_found.com"
-        combined = f"{name.lower().strip()}|{email.lower().strip()}"
-        return hashlib.sha256(combined.encode("utf-8")).hexdigest()
+        email = email or DEFAULT_EMAIL
+
+        # ASCII names and emails, the common case, are normalized as bytes,
+        # skipping the Unicode case mapping and the UTF-8 encoding pass
+        if name.isascii() and email.isascii():
+            return _hash_user_id(
+                name.encode("ascii").lower().strip(ASCII_WHITESPACE),
+                email.encode("ascii").lower().strip(ASCII_WHITESPACE)
+            )
+        return _hash_user_id(
+            name.lower().strip().encode("utf-8"),
+            email.lower().strip().encode("utf-8")
+        )
@@ -3,13 +3,15 @@ This code is part of the AnalyzeAI project.
 It is licensed under the Apache License, Version 2.0.
 See the LICENSE file for more details.
 """
+import asyncio
+import io
 import logging
+import uuid
 from pathlib import Path
-from typing import List, Dict, Optional
-from xhtml2pdf import pisa
+from typing import Optional, Tuple
 from fastapi import HTTPException
 from core.custom_logger import CustomLogger
-from core.prompt_executor import AsyncSingletonPromptExecutor
+from core.prompt_executor import AsyncSingletonPromptExecutor, ChatHistory
 from podels.get_podel import Podel, PodelNode
 
 class Prompt:
@@ -22,9 +24,6 @@ class Prompt:
     """
     def __init__(self, tag: str, logger: Optional[logging.Logger] = None) -> None:
 
-        # File Counter
-        self._file_counter = 0
-
         # Predefined tags for different prompts
         self._test_podel = "test_podel"
         self._sql_podel = "sql_podel"
@@ -43,8 +42,8 @@ class Prompt:
         # Set the tag for the prompt
         self.tag = self._tags_dict[tag]
 
-        # Initialize the PodelNode and AsyncSingletonPromptExecutor
-        self._podel_node: Optional[PodelNode] = None
+        # Initialize the PodelNodes and AsyncSingletonPromptExecutor
+        self._podel_nodes: Optional[Tuple[PodelNode, ...]] = None
         self._executor: Optional[AsyncSingletonPromptExecutor] = None
 
         # Initialize the logger
@@ -69,15 +68,15 @@ class Prompt:
 
         # Get the singleton instance of Podel
         podel_instance: Podel = await Podel.get_instance()
-        self._podel_node = podel_instance.get_podel(tag=self.tag)
+        self._podel_nodes = podel_instance.get_podel(tag=self.tag)
 
-        # Ensure that the PodelNode is not None
-        if not self._podel_node:
+        # Ensure that the PodelNodes are not None
+        if not self._podel_nodes:
             raise ValueError(f"No prompt found for tag: {self.tag}")
 
         # Initialize the AsyncSingletonPromptExecutor
         self._executor = AsyncSingletonPromptExecutor()
-        await self._executor.init(max_concurrent_calls=1)
+        self._executor.init()
 
         # Return the initialized instance
         return self
@@ -97,9 +96,10 @@ class Prompt:
         if not isinstance(tag, str) or not tag or tag not in self._tags_dict:
             raise ValueError("Tag must be a non-empty string.")
 
-    async def _convert_response_to_pdf(self, response: str) -> str:
+    def _convert_response_to_pdf(self, response: str) -> str:
         """
         Converts the response string to a PDF file.
+        Blocking; it is run in a worker thread, off the shared event loop.
         
         Args:
             response (str): The response string to be converted to PDF.
@@ -107,26 +107,27 @@ class Prompt:
         Returns:
             str: The file path of the created PDF file.
         """
-        # Generate a unique file name based on the file counter
+        # Imported on first use; xhtml2pdf pulls in reportlab, which is slow and heavy to load
+        from xhtml2pdf import pisa
+
+        # Generate a unique file name, safe across concurrent tasks and worker processes
         file_path = Path(__file__).parent.parent.joinpath(
             'pdfs',
-            f"sql_to_business_bdoc_{self._file_counter}.pdf"
+            f"sql_to_business_bdoc_{uuid.uuid4().hex}.pdf"
         )
 
-        # Increment the file counter for the next file
-        self._file_counter += 1
-
-        # Write the response to a PDF file
-        with open(file_path, 'w+b') as pdf_file:
+        # Convert the response HTML to PDF in memory
+        pdf_buffer = io.BytesIO()
+        pisa.CreatePDF(
+            src=response,
+            dest=pdf_buffer
+        )
 
-            # Convert the response HTML to PDF
-            pisa.CreatePDF(
-                src=response,
-                dest=pdf_file
-            )
+        # Write the rendered PDF to the file in one call
+        file_path.write_bytes(pdf_buffer.getvalue())
 
         # Log the file creation
-        self.logger.info(f"PDF file created at: {file_path}")
+        self.logger.info("PDF file created at: %s", file_path)
 
         # Return the file path
         return str(file_path)
@@ -155,9 +156,9 @@ class Prompt:
         # For SQL Podel
         if self.tag == self._sql_podel:
 
-            # Initialize SQLPrompt with the PodelNode and executor
+            # Initialize SQLPrompt with the PodelNodes and executor
             sql_prompt_obj = SQLPrompt(
-                podel_node=self._podel_node,
+                podel_nodes=self._podel_nodes,
                 executor=self._executor,
                 logger=self.logger
             )
@@ -168,11 +169,12 @@ class Prompt:
                 business=business
             )
 
-            # Create a pdf file from the response
-            file_path: str = await self._convert_response_to_pdf(response)
+            # Render the PDF in a worker thread; it is CPU-bound and would stall every
+            # task sharing the event loop
+            file_path: str = await asyncio.to_thread(self._convert_response_to_pdf, response)
 
             # Log the file creation
-            self.logger.info(f"PDF file created at: {file_path}")
+            self.logger.info("PDF file created at: %s", file_path)
 
             # Return the file path as a response
             return file_path
@@ -203,10 +205,10 @@ class SQLPrompt():
     """
     def __init__(
             self,
-            podel_node: Prompt,
+            podel_nodes: Tuple[PodelNode, ...],
             executor: Optional[AsyncSingletonPromptExecutor] = None,
             logger: Optional[logging.Logger] = None) -> None:
-        self._podel_node = podel_node
+        self._podel_nodes = podel_nodes
         self.logger = logger or CustomLogger.setup_logger(__name__)
         self._executor = executor
 
@@ -219,48 +221,54 @@ class SQLPrompt():
         Returns:
             str: The response from executing the prompt.
         """
-        # Start with the head of the Podel linked list
-        _head: PodelNode = self._podel_node
-
         # Initialize chat history and response
-        chat_history: Optional[List[Dict[str, str]]] = None
+        chat_history: Optional[ChatHistory] = None
         response = ""
 
-        # Iterate through the linked list of prompts
-        while _head:
+        # The template parameters are the same for every prompt in the chain
+        format_params = {"sql_script": sql_script, "business": business}
 
-            # Log the current prompt and its parameters
-            self.logger.debug("Histoy: %s", chat_history)
-            self.logger.debug("SQL Script: %s", sql_script)
+        # Iterate through the chain of prompts
+        for node in self._podel_nodes:
+
+            # Log the current prompt and its parameters,
+            # skipping the repr of large history/script objects unless DEBUG is on
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug("Histoy: %s", chat_history)
+                self.logger.debug("SQL Script: %s", sql_script)
             self.logger.debug("Business: %s", business)
-            self.logger.debug("Need answer: %s", _head.need_answer)
-            self.logger.debug("Error Message Dict: %s", _head.error_message_dict)
-            self.logger.info("Executing prompt: %s", _head.prompt)
+            self.logger.debug("Need answer: %s", node.need_answer)
+            self.logger.debug("Error Message Dict: %s", node.error_message_dict)
+            self.logger.info("Executing prompt: %s", node.prompt)
 
             # Execute the prompt using the executor
             response, chat_history = await self._executor.execute_prompt(
-                    prompt=_head.prompt.format(sql_script=sql_script, business=business),
-                    chat_history=None if not _head.need_history else chat_history
+                    prompt=(
+                        node.prompt.format_map(format_params)
+                        if node.needs_format else node.prompt
+                    ),
+                    chat_history=None if not node.need_history else chat_history,
+                    # Never cache gate answers, or one rejection would stick on every retry
+                    use_cache=not node.need_answer
                 )
 
             # Log the response
             self.logger.info("Response: %s", response)
 
             # Check if the prompt requires an answer and if it is present in the response
-            if _head.need_answer:
-                if _head.need_answer not in response:
+            if node.need_answer:
+                if node.need_answer not in response:
                     self.logger.error(
                         "Expected answer '%s' not found in response: %s",
-                        _head.need_answer,
+                        node.need_answer,
                         response)
                     raise HTTPException(
-                        status_code=_head.error_message_dict["status_code"],
-                        detail=_head.error_message_dict["message"])
+                        status_code=node.error_message_dict["status_code"],
+                        detail=node.error_message_dict["message"])
                 self.logger.info(
-                    f"Expected answer '{_head.need_answer}' found in response: {response}")
-
-            # Move to the next node in the linked list
-            _head = _head.next
+                    "Expected answer '%s' found in response: %s",
+                    node.need_answer,
+                    response)
 
         # Return the final response after executing all prompts
         return response
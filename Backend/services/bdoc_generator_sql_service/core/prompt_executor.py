@@ -8,13 +8,33 @@ execution of multiple prompts without blocking the event loop.
 """
 import os
 import asyncio
+import hashlib
 import logging
-from typing import Optional, List, Dict
+from typing import MutableMapping, Optional, Sequence, Tuple, Dict
+from cachetools import LRUCache
 from llama_api_client import AsyncLlamaAPIClient
 from core.custom_logger import CustomLogger
 
-# Ensure that the OpenAI API key is set in the environment
-client = AsyncLlamaAPIClient(api_key=os.getenv("LLAMA_API_KEY"))
+# Ensure that the OpenAI API key is set in the environment.
+# The client retries rate limits, 5xx responses and connection errors with
+# exponential backoff and jitter, honouring Retry-After.
+client = AsyncLlamaAPIClient(
+    api_key=os.getenv("LLAMA_API_KEY"),
+    max_retries=int(os.getenv("LLAMA_MAX_RETRIES", "5"))
+)
+
+# Chat history is an immutable tuple of messages; each turn returns a new tuple
+ChatHistory = Tuple[Dict[str, str], ...]
+
+# Cap on in-flight LLM calls per worker process; the API is rate limited, so it defaults
+# to one call at a time and deployments with more quota can raise it
+MAX_CONCURRENT_CALLS = int(os.getenv("LLAMA_MAX_CONCURRENT_CALLS", "1"))
+
+# Exact-match completion cache size per worker process; 0 disables the cache
+RESPONSE_CACHE_SIZE = int(os.getenv("LLAMA_RESPONSE_CACHE_SIZE", "1024"))
+
+# Opening message for conversations without history
+SYSTEM_MESSAGE: Dict[str, str] = {"role": "system", "content": "You are a helpful assistant."}
 
 class AsyncSingletonPromptExecutor:
     """
@@ -25,13 +45,13 @@ class AsyncSingletonPromptExecutor:
     Methods:
         execute_prompt(
             prompt: str, 
-            chat_history: Optional[List[Dict[str, str]]] = None
-        ) -> tuple[str, List[Dict[str, str]]]:
+            chat_history: Optional[Sequence[Dict[str, str]]] = None,
+            use_cache: bool = True
+        ) -> tuple[str, ChatHistory]:
             Executes a prompt using OpenAI's API with concurrency control.
 
     """
     _instance = None
-    _lock = asyncio.Lock()  # Lock for thread-safe singleton instantiation
 
     def __new__(cls, *args, **kwargs) -> 'AsyncSingletonPromptExecutor':
 
@@ -40,61 +60,101 @@ class AsyncSingletonPromptExecutor:
             cls._instance = super().__new__(cls)
         return cls._instance
 
-    def __init__(self, logger: Optional[logging.Logger] = None) -> None:
+    def __init__(
+            self,
+            logger: Optional[logging.Logger] = None,
+            response_cache: Optional[MutableMapping[str, str]] = None
+        ) -> None:
         """
         Initialize the singleton instance.
         This method sets up the semaphore and initializes the chat model and token count.
+
+        Args:
+            logger (Optional[logging.Logger]): The logger instance for logging.
+            response_cache (Optional[MutableMapping[str, str]]): Cache of completions keyed
+                by a digest of the request messages. Defaults to an LRU cache of
+                LLAMA_RESPONSE_CACHE_SIZE entries, or no cache when that is 0.
         """
         # Ensure that the singleton is initialized only once
         if not hasattr(self, '_initialized'):
             self._initialized = True
             self._semaphore = None
+            self._max_concurrent_calls = None
             self._model = None
             self.logger = logger or CustomLogger.setup_logger(__name__)
+            if response_cache is None and RESPONSE_CACHE_SIZE > 0:
+                response_cache = LRUCache(maxsize=RESPONSE_CACHE_SIZE)
+            self._response_cache = response_cache
 
-    async def init(self, max_concurrent_calls : int = 1) -> None:
+    def init(self, max_concurrent_calls: Optional[int] = None) -> None:
         """        
         Initialize the singleton instance with a semaphore to limit concurrent calls.
+        Later calls are no-ops, so the limit cannot be reset while calls are in flight.
+        There is no await between the check and the assignment, so no lock is needed.
+
         Args:
-            max_concurrent_calls (int): Maximum number of concurrent calls allowed.
+            max_concurrent_calls (Optional[int]): Maximum number of concurrent calls allowed.
+                Defaults to LLAMA_MAX_CONCURRENT_CALLS.
         """
         # Ensure that the semaphore is initialized only once
-        async with self._lock:
-            if not hasattr(self, 'semaphore'):
-                self.logger.info("Initializing AsyncSingleton...")
-                self._semaphore = asyncio.Semaphore(max_concurrent_calls)
-                self._model = "Llama-3.3-70B-Instruct"
+        if self._semaphore is None:
+            self.logger.info("Initializing AsyncSingleton...")
+            self._max_concurrent_calls = max_concurrent_calls or MAX_CONCURRENT_CALLS
+            self._semaphore = asyncio.Semaphore(self._max_concurrent_calls)
+            self._model = "Llama-3.3-70B-Instruct"
+
+    def _get_cache_key(self, messages: Sequence[Dict[str, str]]) -> str:
+        """
+        Returns a digest identifying the model and the exact request messages.
+
+        Args:
+            messages (Sequence[dict[str: str]]): The messages sent to the API.
+
+        Returns:
+            str: The cache key for the completion.
+        """
+        digest = hashlib.blake2b(digest_size=32)
+        digest.update(str(self._model).encode())
+        for message in messages:
+            digest.update(b"\0" + message["role"].encode() + b"\0" + message["content"].encode())
+        return digest.hexdigest()
 
     async def execute_prompt(
             self, prompt: str,
-            chat_history: Optional[List[Dict[str, str]]] = None
-        ) -> tuple[str, List[Dict[str, str]]]:
+            chat_history: Optional[Sequence[Dict[str, str]]] = None,
+            use_cache: bool = True
+        ) -> tuple[str, ChatHistory]:
         """Execute a prompt using OpenAI's API with concurrency control.
         
         Args:
             prompt (str): The prompt to be executed.
-            chat_history (list[dict[str: str]]): The chat history to maintain context.
+            chat_history (Sequence[dict[str: str]]): The chat history to maintain context.
+            use_cache (bool): Whether to reuse and store the completion in the response cache.
+                Pass False for prompts whose sampled answer must be drawn afresh on retry.
         Returns:
-            tuple[str, list[dict[str: str]]]: 
+            tuple[str, tuple[dict[str: str], ...]]: 
             The previous responses from the OpenAI API and the updated chat history.
         Raises:
             Exception: If there is an error during the API call.
         """
-        async with self._semaphore:
-
-            # Prepare the chat history for the prompt
-            if chat_history is None or len(chat_history) == 0:
+        # Build the request messages in one allocation, starting with a system message
+        # if there is no chat history; the caller's history is never mutated
+        user_message = {"role": "user", "content": prompt}
+        if not chat_history:
+            messages = (SYSTEM_MESSAGE, user_message)
+        else:
+            messages = (*chat_history, user_message)
+
+        # Return a cached completion for identical messages without taking a call slot
+        cache_key = None
+        if use_cache and self._response_cache is not None:
+            cache_key = self._get_cache_key(messages)
+            text = self._response_cache.get(cache_key)
+            if text is not None:
+                self.logger.debug("Response cache hit: %s", cache_key)
+                return text, (*messages, {"role": "assistant", "content": text})
 
-                # If no chat history, start with a system message
-                messages = [{"role": "system", "content": "You are a helpful assistant."}]
-
-            else:
-
-                # If chat history exists, use it as the context
-                messages = chat_history.copy()
-
-            # Append the user prompt to the messages
-            messages.append({"role": "user", "content": prompt})
+        async with self._semaphore:
 
             try:
 
@@ -105,17 +165,14 @@ class AsyncSingletonPromptExecutor:
                     stream=False,
                     temperature=0.7
                 )
-                # Append the assistant's response to the messages
-                messages.append({
-                    "role": "assistant",
-                    "content": response.completion_message.content.text
-                })
-
-                # Return the assistant's response and the updated chat history
-                return str(response.completion_message.content.text), messages
+                # Cache the completion and return it with the history extended with it
+                text = str(response.completion_message.content.text)
+                if cache_key is not None:
+                    self._response_cache[cache_key] = text
+                return text, (*messages, {"role": "assistant", "content": text})
 
             except Exception as e:
 
-                # Handle any exceptions that occur during the API call
-                self.logger.debug(f"Error executing prompt: {e}")
-                return str(e)
+                # Log and propagate, so callers never mistake an error for a completion
+                self.logger.error("Error executing prompt: %s", e)
+                raise
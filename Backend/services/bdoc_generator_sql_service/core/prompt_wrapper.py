@@ -7,30 +7,43 @@ allowing for efficient execution of multiple prompts without blocking the event
 It also includes methods for checking user
 or IP address counts and updating the database after prompt execution.
 """
-import hashlib
 import asyncio
+import hashlib
 import os
 from logging import Logger
+from pathlib import Path
 from typing import Optional
-from fastapi.responses import JSONResponse
+from cachetools import TTLCache
 from core.jwt_lib import JWTLibrary
 from core.db_service import DBService
 from core.database_connection import AsyncSQLAlchemySingleton
 from core.custom_logger import CustomLogger
+from core.async_runner import AsyncLoopRunner
 from core.prompt import Prompt
-from models.requests import Requests
+
+# Request IDs are only dedup keys, so BLAKE2b replaces SHA-256; set LEGACY_REQUEST_HASH=true
+# to keep matching request rows written with SHA-256 until they have aged out
+LEGACY_REQUEST_HASH = os.getenv("LEGACY_REQUEST_HASH", "false").lower() == "true"
+
+# Directory where submitted SQL scripts are stored, created once at import
+SQL_SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "sql_scripts"
+SQL_SCRIPTS_DIR.mkdir(exist_ok=True)
 
 class PromptWrapper:
     """
     Wrapper class for executing prompts based on a tag and request data.
     """
+    # Request ID -> PDF file path for completed requests, so repeats skip the database.
+    # All access happens on the worker's single event loop, so no lock is needed.
+    _file_path_cache: TTLCache = TTLCache(maxsize=10_000, ttl=3600)
+
     def __init__(
             self,
             tag: str,
             ip_address: Optional[str],
             request_json: dict,
             jwt_token: Optional[str],
-            logger: Logger = CustomLogger.setup_logger(__name__)
+            logger: Optional[Logger] = None
         ):
         """
         Initializes the PromptWrapper with the provided parameters.
@@ -47,7 +60,7 @@ class PromptWrapper:
         self.jwt_token = jwt_token
         self.db_connection: AsyncSQLAlchemySingleton = AsyncSQLAlchemySingleton()
         self.db_connection.init_engine()
-        self.logger = logger
+        self.logger = logger or CustomLogger.setup_logger(__name__)
 
         # Derive SQL Script and Business Name from request
         self.sql_script = self.request_json.get("script", None)
@@ -62,9 +75,6 @@ class PromptWrapper:
             logger=self.logger
         )
 
-        # Response Messages
-        self.count_zero_response_message = "No More Requests Left"
-
     async def execute(self) -> Optional[str]:
         """
         Executes the prompt based on the provided tag and request data.
@@ -78,66 +88,58 @@ class PromptWrapper:
         user_id: Optional[str] = None
 
         # Generate Request Hash
-        request_id: str = await self._get_request_hash()
+        request_id: str = self._get_request_hash(self.sql_script, self.business_name)
 
-        # Check if the request has already been executed
-        previous_request: Requests = await self.db_service.get_request_by_request_id(
-            request_id=request_id
-        )
+        # Return the cached file path if this request was already executed
+        cached_file_path: Optional[str] = self._file_path_cache.get(request_id)
+        if cached_file_path:
+            return cached_file_path
 
-        # If the request has already been executed, return the file path
-        if previous_request:
+        # Flag to check if user is logged in
+        is_user_logged_in = self.jwt_token is not None
 
-            # Get the file path from the previous request
-            file_path = await self.db_service.get_pdf_file_path_by_pdf_id(
-                pdf_id=previous_request.pdf_id)
+        # Share one session for the lookups; it is released before the LLM call
+        async with self.db_service.session_scope():
 
-            return file_path
+            # Check if the request has already been executed
+            previous_file_path: Optional[str] = await self.db_service.get_pdf_path_by_request_id(
+                request_id=request_id
+            )
 
-        # Flag to check if user is logged in
-        is_user_logged_in = self.jwt_token is not None
+            # If the request has already been executed, return the file path
+            if previous_file_path:
+                self._file_path_cache[request_id] = previous_file_path
+                return previous_file_path
 
-        # Check Capacity for User or IP
-        if not is_user_logged_in:
-            count = await self._execute_for_ip(self.ip_address)
+            # Reserve a request for the User or IP
+            if not is_user_logged_in:
+                count = await self._execute_for_ip(self.ip_address)
 
-        else:
-            # Get User ID from JWT Token
-            user_id = await self.jwt_lib.get_user_id_from_jwt(token=self.jwt_token)
+            else:
+                # Get User ID from JWT Token
+                user_id = self.jwt_lib.get_user_id_from_jwt(token=self.jwt_token)
 
-            count = await self._execute_for_user(user_id=user_id)
+                count = await self._execute_for_user(user_id=user_id)
 
         # If count is None, it means no more requests left
         if count is None:
-            return JSONResponse(
-                content={"message": self.count_zero_response_message},
-                status_code=403
-            )
-
-        # Execute the prompt
-        file_path: str = await self._execute_sql_prompt()
-
-        # Update Database with the executed prompt
+            return None
 
-        # Update Count for User or IP
-        if is_user_logged_in:
-            await self.db_service.update_count_for_user(
+        # Execute the prompt, giving the reserved request back if it fails
+        try:
+            file_path: str = await self._execute_sql_prompt()
+        except Exception:
+            await self.db_service.refund_request(user_id=user_id, ip_address=self.ip_address)
+            raise
+
+        # Update Database with the executed prompt, sharing one session for the writes
+        async with self.db_service.session_scope():
+            await self._update_database_after_execution(
+                file_path=file_path,
+                request_id=request_id,
                 user_id=user_id,
-                new_count=count - 1
-            )
-        else:
-            await self.db_service.update_count_for_ip(
-                ip_address=self.ip_address,
-                new_count=count - 1
-            )
-
-        # Update Database
-        await self._update_database_after_execution(
-            file_path=file_path,
-            request_id=request_id,
-            user_id=user_id,
-            ip_address=self.ip_address
-            )
+                ip_address=self.ip_address
+                )
 
         # Return the file path
         return file_path
@@ -151,66 +153,34 @@ class PromptWrapper:
             Optional[str]: 
                 The file path of the generated PDF document or None if no requests left.
         """
-        try:
-            loop = asyncio.get_running_loop()
-        except RuntimeError:
-            # No running loop → safe to use asyncio.run()
-            return asyncio.run(self.execute())
-        else:
-            # Running loop → run task in it
-            return loop.run_until_complete(self.execute())
+        # Run on the worker's shared event loop so the DB pool and LLM client are reused
+        return AsyncLoopRunner().run(self.execute())
 
     async def _execute_for_ip(self, ip_address: str) -> Optional[int]:
         """
-        Executes the prompt for a user based on their IP address.
+        Reserves a request for a user based on their IP address.
 
         Args:
             ip_address (str): The IP address of the user.
 
         Returns:
-            Optional[int]: The count of requests left for the user based on their IP address.
+            Optional[int]: The count of requests left for the user based on their IP address
+                after this one, or None if no requests are left.
         """
-
-        # Check Count for IP Address
-        count = await self.db_service.get_count_for_ip(ip_address=ip_address)
-
-        # If count is None, it means the IP is new or not found
-        if count is None:
-
-            # New IP, insert into database
-            count = await self.db_service.inset_new_ip(ip_address=ip_address)
-
-        # If count is 0, return the zero response message
-        elif count == 0:
-
-            # No more requests left for this IP
-            return None
-
-        return count
+        # New IPs are inserted with their default count in the same statement
+        return await self.db_service.reserve_request_for_ip(ip_address=ip_address)
 
     async def _execute_for_user(self, user_id: str) -> Optional[int]:
         """
-        Executes the prompt for a logged-in user.
+        Reserves a request for a logged-in user.
         Args:
             user_id (str): The ID of the user.
         Returns:
-            str: The response from executing the prompt.
+            Optional[int]: The count of requests left for the user after this one,
+                or None if no requests are left.
         """
-        # User is logged in, check user count
-        count = await self.db_service.get_count_for_user(user_id=user_id)
-
-        # If count is None, it means the user is new or not found
-        if count is None:
-
-            # New User, insert into database
-            count = await self.db_service.insert_new_user(user_id=user_id)
-
-        elif count == 0:
-
-            # No more requests left for this user
-            return None
-
-        return count
+        # New users are inserted with their default capacity in the same statement
+        return await self.db_service.reserve_request_for_user(user_id=user_id)
 
     async def _execute_sql_prompt(self) -> str:
         """
@@ -230,18 +200,26 @@ class PromptWrapper:
 
         return file_path
 
-    async def _get_request_hash(self) -> str:
+    @staticmethod
+    def _get_request_hash(sql_script: Optional[str], business_name: Optional[str]) -> str:
         """
         Generates a unique hash for the request based on the SQL script and business name.
 
+        Args:
+            sql_script (Optional[str]): The SQL script from the request.
+            business_name (Optional[str]): The business name from the request.
+
         Returns:
             str: The unique hash for the request.
         """
         # Create a unique string based on the SQL script and business name
-        unique_string = f"{self.sql_script}|||{self.business_name}"
+        unique_string = f"{sql_script}|||{business_name}"
 
-        # Generate a SHA-256 hash of the unique string
-        request_hash = hashlib.sha256(unique_string.encode()).hexdigest()
+        # Generate a 32-byte BLAKE2b hash of the unique string
+        if LEGACY_REQUEST_HASH:
+            request_hash = hashlib.sha256(unique_string.encode()).hexdigest()
+        else:
+            request_hash = hashlib.blake2b(unique_string.encode(), digest_size=32).hexdigest()
 
         return request_hash
 
@@ -260,15 +238,12 @@ class PromptWrapper:
             str: The file path for the SQL script.
         """
         # Create the file path
-        file_path = os.path.join(
-            os.path.dirname(os.path.dirname(__file__)),
-            "sql_scripts",
-            f"{business_name}_{request_id}.sql")
+        file_path = SQL_SCRIPTS_DIR / f"{business_name}_{request_id}.sql"
 
-        with open(file_path, 'w', encoding="utf-8") as file:
-            file.write(sql_script)
+        # Write the script in a worker thread so a slow disk does not stall the event loop
+        await asyncio.to_thread(file_path.write_text, sql_script, encoding="utf-8")
 
-        return file_path
+        return str(file_path)
 
 
     async def _update_database_after_execution(
@@ -300,43 +275,23 @@ class PromptWrapper:
             request_id=request_id
         )
 
-        # Update SQL Table with the executed SQL script
-        sql_id = await self.db_service.insert_sql_script(
+        # Update SQL, PDF and Requests Tables in one transaction
+        await self.db_service.record_prompt_result(
             sql_script_path=sql_script_file_path,
-            business_id=business_id
-        )
-
-        # Update PDF Table with the new document
-        pdf_id = await self.db_service.insert_pdf_file(
-            file_path=file_path,
-            sql_id=sql_id
-        )
-
-        # Update Requests Table with the new request
-        await self.db_service.insert_new_request(
+            business_id=business_id,
+            pdf_file_path=file_path,
             request_id=request_id,
             user_id=user_id,
-            ip_address=ip_address,
-            pdf_id=pdf_id
+            ip_address=ip_address
         )
 
-        # Update the count for the user or IP address
-        if user_id:
-            await self.db_service.update_count_for_user(
-                user_id=user_id,
-                new_count=await self.db_service.get_count_for_user(user_id=user_id) - 1
-            )
-        else:
-            await self.db_service.update_count_for_ip(
-                ip_address=ip_address,
-                new_count=await self.db_service.get_count_for_ip(ip_address=ip_address) - 1
-            )
+        # Cache the file path for repeats of this request
+        self._file_path_cache[request_id] = file_path
 
         # Log the successful execution
         self.logger.info("Updated Database...")
-        self.logger.debug("File Path: %s", file_path)
-        self.logger.debug("Request ID: %s", request_id)
-        self.logger.debug("User ID: %s", user_id)
-        self.logger.debug("IP Address: %s", ip_address)
-        self.logger.debug("Business ID: %s", business_id)
+        self.logger.debug(
+            "File Path: %s, Request ID: %s, User ID: %s, IP Address: %s, Business ID: %s",
+            file_path, request_id, user_id, ip_address, business_id
+        )
             
\ No newline at end of file
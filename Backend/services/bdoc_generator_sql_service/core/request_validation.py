@@ -5,7 +5,8 @@ It ensures that all required keys are present in a request, logging verification
 and raising an HTTPException if any required key is missing.
 """
 from logging import Logger
-from fastapi import Request, HTTPException
+from typing import Any, Iterable, Mapping
+from fastapi import HTTPException
 from .custom_logger import CustomLogger
 
 class RequestValidation:
@@ -18,32 +19,41 @@ class RequestValidation:
     Methods:
         __init__(logger: Logger = CustomLogger.setup_logger())
             Initializes the RequestValidation instance with a logger.
-        async validate_request(request: Request, required_keys: list[str] = []) -> bool
+        validate_request(request: Mapping[str, Any], required_keys: frozenset[str]) -> bool
     """
     def __init__(self, logger: Logger = CustomLogger()) -> None:
         self._logger = logger
 
-    async def validate_request(self, request: Request, required_keys: list[str]) -> bool:
+    def validate_request(self, request: Mapping[str, Any], required_keys: Iterable[str]) -> bool:
         """
         Validates that all required keys are present in the incoming request.
-        Iterates through the provided list of required keys and checks
-        if each key exists in the request object.
+        Computes the missing keys with a single set difference against the request keys.
         If any required key is missing, raises an HTTPException with status code 422.
-        Logs verification for each key found.
+        Pass a frozenset built once per route to avoid rebuilding it per request.
 
         Args:
-            request (Request): The incoming request object to validate.
-            required_keys (list[str], optional): 
-                List of keys that must be present in the request. Defaults to [].
+            request (Mapping[str, Any]): The parsed request body or cookies to validate.
+            required_keys (Iterable[str]): 
+                Keys that must be present in the request.
 
         Raises:
-            HTTPException: If any required key is missing from the request.
+            HTTPException: If the request is not a mapping or any required key is missing.
 
         Returns:
             bool: True if all required keys are present.
         """
-        for key in required_keys:
-            if key not in request:
-                raise HTTPException(status_code=422, detail=f"Missing or null key: {key}")
-            self._logger.debug(f"Verified that key: {key} exists in Requests")
+        if not isinstance(required_keys, frozenset):
+            required_keys = frozenset(required_keys)
+
+        # A JSON body can be any value; only an object can carry the keys
+        if not isinstance(request, Mapping):
+            raise HTTPException(status_code=422, detail="Request body must be a JSON object")
+
+        missing = required_keys - request.keys()
+        if missing:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Missing or null key: {', '.join(sorted(missing))}"
+            )
+        self._logger.debug("Verified that keys: %s exist in Requests", required_keys)
         return True
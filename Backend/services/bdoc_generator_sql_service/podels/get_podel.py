@@ -4,21 +4,41 @@ This module defines a singleton class to manage Podels from a YAML file.
 It provides methods to read the YAML file and retrieve Podel nodes based on tags.
 """
 from dataclasses import dataclass
-from typing import Optional, List
+from typing import Optional, Dict, Tuple
 import asyncio
 import logging
 import os
 import yaml
 from core.custom_logger import CustomLogger
 
+# Prefer the libyaml-backed loader and fall back to the pure-Python one
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+PODEL_YML_PATH = os.path.join(os.path.dirname(__file__), "podel.yml")
+
+def _load_podel_yml() -> dict:
+    """
+    Reads and parses the Podel YAML file.
+
+    Returns:
+        dict: The parsed YAML document.
+    """
+    with open(PODEL_YML_PATH, 'r', encoding='utf-8') as file:
+        return yaml.load(file, Loader=SafeLoader)
+
+# Parsed once at import, so the first get_instance() does no file I/O on the event loop
+PODEL_DATA: dict = _load_podel_yml()
+
 @dataclass
 class PodelNode:
     """
-    Represents a node in the Podel linked list.
+    Represents a single prompt in a Podel chain.
     """
-    prev: Optional["PodelNode"] = None
-    next: Optional["PodelNode"] = None
     prompt: str = ""
+    needs_format: bool = False
     need_history: bool = True
     need_answer: Optional[str] = None
     error_message_dict: Optional[dict] = None
@@ -49,55 +69,47 @@ class Podel:
 
     def __init__(self, logger: Optional[logging.Logger] = None) -> None:
         self.logger = logger or CustomLogger.setup_logger(__name__)
-        self._yml_file_path = os.path.join(
-            os.path.dirname(__file__), "podel.yml"
-        )
         self.podels = self._get_all_podels()
 
-    def _get_all_podels(self) -> List[PodelNode]:
+    def _get_all_podels(self) -> Dict[str, Tuple[PodelNode, ...]]:
         """
-        Reads the YAML file and returns a list of PodelNode instances.
+        Builds the chain of PodelNode instances for each tag from the parsed YAML file.
         """
-        with open(self._yml_file_path, 'r', encoding='utf-8') as file:
-            data = yaml.safe_load(file)
-
         podels = {}
 
-        for tag, list_of_prompts_dict in data.get('podels', {}).items():
+        for tag, list_of_prompts_dict in PODEL_DATA.get('podels', {}).items():
 
-            _head = None
+            nodes = []
 
             for prompt_dict in list_of_prompts_dict:
-                self.logger.debug(f"Prompt Dict: {prompt_dict}")
+                self.logger.debug("Prompt Dict: %s", prompt_dict)
                 prompt = prompt_dict.get('prompt', '')
                 need_history = prompt_dict.get('need_history', True)
                 need_answer = prompt_dict.get('need_answer', None)
                 error_message_dict = prompt_dict.get('error_message', None)
                 node = PodelNode(
                     prompt=prompt,
+                    # Only templates with braces need str.format at execution time
+                    needs_format="{" in prompt or "}" in prompt,
                     need_history=need_history,
                     need_answer=need_answer,
                     error_message_dict=error_message_dict
                 )
-                if _head is None:
-                    _head = node
-                    podels[tag] = _head
-                else:
-                    node.prev = _head
-                    _head.next = node
-                    _head = node
+                nodes.append(node)
+
+            podels[tag] = tuple(nodes)
 
         return podels
 
-    def get_podel(self, tag: str) -> Optional[PodelNode]:
+    def get_podel(self, tag: str) -> Optional[Tuple[PodelNode, ...]]:
         """
-        Returns the head of the Podel linked list for the given tag.
+        Returns the chain of PodelNodes for the given tag, in execution order.
         
         Args:
             tag (str): The tag for which to retrieve the Podel.
         
         Returns:
-            Optional[PodelNode]: The head of the Podel linked list or None if not found.
+            Optional[Tuple[PodelNode, ...]]: The Podel chain or None if not found.
         """
         self.logger.debug("Retrieving Podel for tag: %s", tag)
         self.logger.debug("Available Podels: %s", list(self.podels.keys()))
@@ -3,20 +3,23 @@ This module contains the main FastAPI application for handling prompt execution,
 user count updates, and retrieving business names.
 """
 # ----------------------------- Importing Required Libraries -----------------------------
+import asyncio
+import hmac
+import logging
 import os
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware import Middleware
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
-from starlette.middleware.sessions import SessionMiddleware
+import orjson
+from fastapi.responses import FileResponse, ORJSONResponse
 from core.request_validation import RequestValidation
-from celery_task.celery_app import celery_app
+from celery_task.celery_app import celery_app, TASK_STATUS_NO_REQUESTS_LEFT
 from celery.result import AsyncResult
 from celery.exceptions import CeleryError
 from core.database_connection import AsyncSQLAlchemySingleton
 from core.custom_logger import CustomLogger
 from core.database_wrapper import DatabaseWrapper
-from celery_task.task import execute_prompt_task
 
 
 # ----------------------------- Initializing the environment -----------------------------
@@ -31,39 +34,52 @@ async def lifespan(fastapi_app: FastAPI):
     await db.create_schema_if_not_exists()
     await db.seed_business_domains()
     fastapi_app.state.db = db
+    fastapi_app.state.db_wrapper = DatabaseWrapper(db_connection=db, logger=logger)
     yield
     # NOTE: Cleanup can be added here if needed
 
 # Initialize the logger
 logger = CustomLogger.setup_logger(__name__)
 
-# Initialize the FastAPI application
-app = FastAPI(lifespan=lifespan)
-
-# Initialize the session middleware
-app.add_middleware(
-    SessionMiddleware,
-    secret_key = os.getenv("SESSION_SECRET"),
-    same_site = "lax",
-    # https_only = True # NOTE: Turn it on in Production
+# Comma-separated origins allowed to call the API, read once
+ALLOW_ORIGINS = tuple(
+    origin.strip() for origin in os.getenv("CORS_ORIGINS", "*").split(",") if origin.strip()
 )
 
-# CORS middleware to allow cross-origin requests
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+# Initialize the FastAPI application, passing the middleware to the constructor
+# so the stack is built once
+app = FastAPI(
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+    middleware=[
+        # CORS middleware to allow cross-origin requests
+        Middleware(
+            CORSMiddleware,
+            allow_origins=ALLOW_ORIGINS,
+            allow_credentials=True,
+            allow_methods=["*"],
+            allow_headers=["*"],
+        ),
+    ]
 )
 
 # Initiate Validation Utility
 request_validator = RequestValidation(logger=logger)
 
+# Required keys per endpoint, built once
+PROMPT_REQUIRED_KEYS = frozenset({"script", "business"})
+UPDATE_COUNT_REQUIRED_KEYS = frozenset({"access_token"})
+
+# Message for callers with no requests left
+COUNT_ZERO_RESPONSE_MESSAGE = "No More Requests Left"
+
+# Service credential for setting request quotas; the endpoint is disabled when unset
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY", "").encode()
+
 # ----------------------------- API Endpoints -----------------------------
 # Endpoint to execute a prompt based on the provided tag
 @app.post("/prompt/{tag}")
-async def enqueue_prompt(tag: str, request: Request = None) -> JSONResponse:
+async def enqueue_prompt(tag: str, request: Request = None) -> ORJSONResponse:
     """
     Execute a prompt based on the provided tag and text.
     
@@ -74,69 +90,74 @@ async def enqueue_prompt(tag: str, request: Request = None) -> JSONResponse:
     Returns:
         str: The response from executing the prompt.
     """
-    # Wait for the request JSON to be available
-    request_json = await request.json()
+    # Wait for the request body and parse it with orjson
+    request_json = orjson.loads(await request.body())
 
-    # Log the tag and request JSON
-    logger.debug(f"Executing prompt for tag: {tag}")
-    logger.debug(f"Request JSON: {request_json}")
+    # Log the tag and request JSON, rendering the body only when DEBUG is on
+    logger.debug("Executing prompt for tag: %s", tag)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Request JSON: %s", request_json)
 
     # Validate Request
-    await request_validator.validate_request(
+    request_validator.validate_request(
         request=request_json,
-        required_keys=[
-            "script",
-            "business"
-        ])
+        required_keys=PROMPT_REQUIRED_KEYS)
 
     # Validate Count
     jwt_token = request.cookies.get("access_token", None)
 
     try:
 
-        task = execute_prompt_task.delay(
-            tag=tag,
-            request_json=request_json,
-            jwt_token=jwt_token,
-            ip_address=request.client.host if request.client else None
+        # Enqueue by name so the API does not import the worker's prompt dependencies
+        task = celery_app.send_task(
+            "celery_task.task.execute_prompt_task",
+            kwargs={
+                "tag": tag,
+                "request_json": request_json,
+                "jwt_token": jwt_token,
+                "ip_address": request.client.host if request.client else None
+            }
         )
-        return JSONResponse({
+        return ORJSONResponse({
             "task_id": task.id,
             "status": "queued"
         })
 
     except (CeleryError, ValueError, RuntimeError) as e:
-        logger.error(f"Celery error enqueueing task: {e}")
-        return JSONResponse(
+        logger.error("Celery error enqueueing task: %s", e)
+        return ORJSONResponse(
             content={"error": str(e)},
             status_code=500
         )
 
 # Endpoint to update the user count
 @app.put("/update/user/count/{count}")
-async def update_user_count(count: int, request: Request) -> JSONResponse:
+async def update_user_count(count: int, request: Request) -> ORJSONResponse:
     """
     Update the user count based on the provided count.
+    Only callers presenting ADMIN_API_KEY in the X-Admin-Key header may set a quota.
     Args:
         count (int): The count to be updated.
         request (Request): The request object containing user information.
+    Raises:
+        HTTPException: 401 error when the admin key is missing or wrong
     Returns:
-        JSONResponse: A response indicating the success or failure of the operation.
+        ORJSONResponse: A response indicating the success or failure of the operation.
     """
-    # Awaiting the request JSON
-    await request.json()
-
-    # Validate the request
-    await request_validator.validate_request(
-        request=request,
-        required_keys=["acess_token"]
+    # Users must not set their own quota, so require the service credential
+    admin_key = request.headers.get("X-Admin-Key", "").encode()
+    if not ADMIN_API_KEY or not hmac.compare_digest(admin_key, ADMIN_API_KEY):
+        logger.warning("Rejected user count update without a valid admin key")
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    # Validate the request; the access token is sent as a cookie, not in the body
+    request_validator.validate_request(
+        request=request.cookies,
+        required_keys=UPDATE_COUNT_REQUIRED_KEYS
     )
 
-    # Initialize the DatabaseWrapper
-    db_wrapper = DatabaseWrapper(
-        db_connection=app.state.db,
-        logger=logger
-    )
+    # Shared DatabaseWrapper created at startup
+    db_wrapper: DatabaseWrapper = request.app.state.db_wrapper
 
     # Update the count for the user
     success = await db_wrapper.update_count_for_user_from_request(
@@ -145,14 +166,14 @@ async def update_user_count(count: int, request: Request) -> JSONResponse:
     )
 
     # Return the response
-    return JSONResponse(
+    return ORJSONResponse(
         content={"success": success, "message": "User count updated successfully."},
         status_code=200
     )
 
 
 @app.get("/task/{task_id}")
-async def get_task_status(task_id: str) -> JSONResponse:
+async def get_task_status(task_id: str) -> ORJSONResponse:
     """
     Get the status of a Celery task by its ID.
 
@@ -160,35 +181,55 @@ async def get_task_status(task_id: str) -> JSONResponse:
         task_id (str): The ID of the Celery task.
 
     Returns:
-        JSONResponse: A JSON response containing the task status and result if available.
+        ORJSONResponse: A JSON response containing the task status and result if available.
     """
     result = AsyncResult(task_id, app=celery_app)
     if result.state == "PENDING":
-        return JSONResponse({"task_id": task_id, "status": "pending"})
+        return ORJSONResponse({"task_id": task_id, "status": "pending"})
     elif result.state == "SUCCESS":
+        if result.result.get("status") == TASK_STATUS_NO_REQUESTS_LEFT:
+            return ORJSONResponse(
+                content={
+                    "task_id": task_id,
+                    "status": TASK_STATUS_NO_REQUESTS_LEFT,
+                    "message": COUNT_ZERO_RESPONSE_MESSAGE
+                },
+                status_code=403
+            )
         file_path: str | None = result.result.get("file_path", None)
         if file_path:
+            # Stat the PDF once off the event loop; FileResponse takes its
+            # Content-Length and ETag from it instead of statting again
+            try:
+                stat_result = await asyncio.to_thread(os.stat, file_path)
+            except FileNotFoundError:
+                logger.error("PDF file for task %s not found: %s", task_id, file_path)
+                return ORJSONResponse(
+                    content={"task_id": task_id, "status": "failed", "error": "PDF file not found"},
+                    status_code=404
+                )
             return FileResponse(
                 path=file_path,
                 filename="Bdoc-by-AnalyzeAI.pdf",
-                media_type='application/pdf'
+                media_type='application/pdf',
+                stat_result=stat_result
             )
-        return JSONResponse({
+        return ORJSONResponse({
             "task_id": task_id,
             "status": "completed",
             "result": result.result
         })
     elif result.state == "FAILURE":
-        return JSONResponse({
+        return ORJSONResponse({
             "task_id": task_id,
             "status": "failed",
             "error": str(result.result)
         })
-    return JSONResponse({"task_id": task_id, "status": result.state})
+    return ORJSONResponse({"task_id": task_id, "status": result.state})
 
 # Endpoint to get all the business names
 @app.get("/business/names")
-async def get_all_business_names() -> JSONResponse:
+async def get_all_business_names(request: Request) -> ORJSONResponse:
     """
     Retrieve all Supporting Business Names
 
@@ -197,16 +238,13 @@ async def get_all_business_names() -> JSONResponse:
     Retrieve all Supporting Business Names from the database.
 
     Returns:
-        JSONResponse: JSON with key names and value list of business names
+        ORJSONResponse: JSON with key names and value list of business names
     """
-    # Initialize the DatabaseWrapper
-    db_wrapper = DatabaseWrapper(
-        db_connection=app.state.db,
-        logger=logger
-    )
+    # Shared DatabaseWrapper created at startup
+    db_wrapper: DatabaseWrapper = request.app.state.db_wrapper
 
     # Return JSON Response where names is the key
-    return JSONResponse(
+    return ORJSONResponse(
         {
             "names": await db_wrapper.get_all_business()
         }
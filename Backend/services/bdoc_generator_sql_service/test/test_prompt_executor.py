@@ -3,12 +3,52 @@ Test cases for AsyncSingletonPromptExecutor class.
 This module contains unit tests for the AsyncSingletonPromptExecutor class,
 which is designed to execute prompts using OpenAI's API with concurrency control.
 """
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 
 from core.prompt_executor import AsyncSingletonPromptExecutor
 
 
+@pytest.fixture(autouse=True)
+def reset_singleton():
+    """
+    Reset the AsyncSingletonPromptExecutor singleton around each test,
+    so semaphore and cache state do not leak between tests.
+    """
+    AsyncSingletonPromptExecutor._instance = None
+    yield
+    AsyncSingletonPromptExecutor._instance = None
+
+
+@pytest.fixture
+def mock_create():
+    """
+    Mock the Llama API completion call.
+
+    Returns:
+        AsyncMock: Mocked client.chat.completions.create.
+    """
+    with patch(
+        "core.prompt_executor.client.chat.completions.create",
+        new_callable=AsyncMock
+    ) as mocked:
+        yield mocked
+
+
+def make_response(text: str) -> MagicMock:
+    """
+    Build a completion response carrying the given text.
+
+    Args:
+        text (str): The assistant's reply.
+    Returns:
+        MagicMock: Object shaped like a Llama API completion response.
+    """
+    response = MagicMock()
+    response.completion_message.content.text = text
+    return response
+
+
 @pytest.mark.asyncio
 async def test_singleton_instance():
     """
@@ -24,8 +64,7 @@ async def test_singleton_instance():
     assert inst1 is inst2  # Singleton check
 
 
-@pytest.mark.asyncio
-async def test_init_semaphore():
+def test_init_semaphore():
     """
     Test the initialization of the semaphore in AsyncSingletonPromptExecutor.
     This test checks if the semaphore is initialized with the correct value
@@ -36,12 +75,11 @@ async def test_init_semaphore():
         None
     """
     executor = AsyncSingletonPromptExecutor()
-    await executor.init(max_concurrent_calls=2)
+    executor.init(max_concurrent_calls=2)
     assert executor._semaphore._value == 2
 
 
 @pytest.mark.asyncio
-@patch("your_module_name.client.chat.completions.create")
 async def test_execute_prompt_without_history(mock_create):
     """
     Test executing a prompt without any chat history.
@@ -53,14 +91,10 @@ async def test_execute_prompt_without_history(mock_create):
     Returns:
         None
     """
-    mock_response = AsyncMock()
-    mock_response.choices = [type("obj", (object,), {
-        "message": type("msg", (object,), {"content": "Hello!"})
-    })()]
-    mock_create.return_value = mock_response
+    mock_create.return_value = make_response("Hello!")
 
     executor = AsyncSingletonPromptExecutor()
-    await executor.init()
+    executor.init()
 
     reply, history = await executor.execute_prompt("Hi")
     assert reply == "Hello!"
@@ -70,7 +104,6 @@ async def test_execute_prompt_without_history(mock_create):
 
 
 @pytest.mark.asyncio
-@patch("your_module_name.client.chat.completions.create")
 async def test_execute_prompt_with_history(mock_create):
     """
     Test executing a prompt with existing chat history.
@@ -81,21 +114,44 @@ async def test_execute_prompt_with_history(mock_create):
     Returns:
         None
     """
-    mock_response = AsyncMock()
-    mock_response.choices = [type("obj", (object,), {
-        "message": type("msg", (object,), {"content": "Goodbye!"})
-    })()]
-    mock_create.return_value = mock_response
+    mock_create.return_value = make_response("Goodbye!")
 
     executor = AsyncSingletonPromptExecutor()
-    await executor.init()
+    executor.init()
 
-    history = [
+    history = (
         {"role": "system", "content": "You are a helpful assistant."},
         {"role": "user", "content": "Hello"},
         {"role": "assistant", "content": "Hi there!"}
-    ]
+    )
 
     reply, updated_history = await executor.execute_prompt("Bye", chat_history=history)
     assert reply == "Goodbye!"
     assert len(updated_history) == 5
+    assert updated_history[:3] == history
+    assert mock_create.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_execute_prompt_response_cache(mock_create):
+    """
+    Test that identical prompts are served from the response cache,
+    unless the caller opts out of it.
+    Args:
+        mock_create (AsyncMock): Mocked OpenAI API call.
+    Returns:
+        None
+    """
+    mock_create.return_value = make_response("No")
+
+    executor = AsyncSingletonPromptExecutor()
+    executor.init()
+
+    await executor.execute_prompt("Is this valid SQL?", use_cache=False)
+    await executor.execute_prompt("Is this valid SQL?", use_cache=False)
+    assert mock_create.await_count == 2
+
+    await executor.execute_prompt("Is this valid SQL?")
+    reply, _ = await executor.execute_prompt("Is this valid SQL?")
+    assert reply == "No"
+    assert mock_create.await_count == 3
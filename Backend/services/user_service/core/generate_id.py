@@ -6,6 +6,7 @@ a default placeholder is used. This is useful for systems that require
 anonymized or consistent user identification.
 """
 import hashlib
+from functools import lru_cache
 from typing import Optional
 from logging import Logger
 from sqlalchemy.dialects.postgresql import insert
@@ -13,6 +14,33 @@ from core.custom_logger import CustomLogger
 from core.database_connection import AsyncSQLAlchemySingleton
 from models.user import Users
 
+# Placeholder used when the OAuth provider does not return an email
+DEFAULT_EMAIL = "not_found@not_found.com"
+
+# Characters str.strip() removes from ASCII text, so stripping bytes gives the same result
+ASCII_WHITESPACE = b" \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f"
+
+@lru_cache(maxsize=4096)
+def _hash_user_id(name: bytes, email: bytes) -> str:
+    """
+    Hashes an already normalized name and email pair.
+    Memoized because repeat logins of the same users hash the same pair again.
+
+    Args:
+        name (bytes): Lower-cased, stripped, UTF-8 encoded name of User
+        email (bytes): Lower-cased, stripped, UTF-8 encoded email of User
+
+    Returns:
+        str: Hash Combination of both
+    """
+    # SHA-256 must stay: user IDs are stored primary keys shared with the
+    # bdoc service. Feed the parts to the hash directly rather than
+    # building a joined string first.
+    digest = hashlib.sha256(name)
+    digest.update(b"|")
+    digest.update(email)
+    return digest.hexdigest()
+
 class GenerateId:
     """
     GenerateUserId is a utility class for generating consistent and unique user identifiers.
@@ -45,9 +73,19 @@ class GenerateId:
         Returns:
             str: Hash Combination of both
         """
-        email = email or "not_found@not_found.com"
-        combined = f"{name.lower().strip()}|{email.lower().strip()}"
-        return hashlib.sha256(combined.encode("utf-8")).hexdigest()
+        email = email or DEFAULT_EMAIL
+
+        # ASCII names and emails, the common case, are normalized as bytes,
+        # skipping the Unicode case mapping and the UTF-8 encoding pass
+        if name.isascii() and email.isascii():
+            return _hash_user_id(
+                name.encode("ascii").lower().strip(ASCII_WHITESPACE),
+                email.encode("ascii").lower().strip(ASCII_WHITESPACE)
+            )
+        return _hash_user_id(
+            name.lower().strip().encode("utf-8"),
+            email.lower().strip().encode("utf-8")
+        )
 
     async def create_user(
             self,
@@ -66,23 +104,31 @@ class GenerateId:
             bool: True if user creation is successful, False otherwise.
         """
         user_id = self.generate_user_id(name, email)
+        email = email or DEFAULT_EMAIL
 
-        async with db_connection.get_session() as session:
+        async with db_connection.begin() as conn:
             new_user = insert(Users).values(
                 user_id=user_id,
                 name=name,
-                email=email or "not_found@not_found.com"
-            ).on_conflict_do_update(
+                email=email
+            )
+
+            # Only rewrite the row when the name or email actually changed,
+            # so repeat logins do not generate dead tuples
+            new_user = new_user.on_conflict_do_update(
                 index_elements=["user_id"],
                 set_={
-                    "name": name,
-                    "email": email or "not_found@not_found.com"
-                }
+                    "name": new_user.excluded.name,
+                    "email": new_user.excluded.email
+                },
+                where=(
+                    Users.name.is_distinct_from(new_user.excluded.name)
+                    | Users.email.is_distinct_from(new_user.excluded.email)
+                )
             )
 
-            await session.execute(new_user)
-            await session.commit()
+            await conn.execute(new_user)
 
-        self.logger.info(f"User created with ID: {user_id}")
+        self.logger.info("User created with ID: %s", user_id)
 
         return True
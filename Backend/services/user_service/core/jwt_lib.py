@@ -22,12 +22,19 @@ Functions:
             None: If the token is invalid or expired.
 """
 from datetime import datetime, timedelta, timezone
+import hashlib
 import os
+import time
 from typing import Optional
-from jose import JWTError, jwt
+import jwt
+from cachetools import TTLCache
 from core.generate_id import GenerateId
 from core.custom_logger import CustomLogger
 
+# Verified payloads are reused for the same token for up to this many seconds
+DECODE_CACHE_SECONDS = 30
+DECODE_CACHE_SIZE = 50_000
+
 class JWTLibrary:
     """
     AuthLibrary provides methods for creating and decoding
@@ -35,34 +42,46 @@ class JWTLibrary:
     It manages token generation with expiration
     and secure encoding/decoding using a configurable secret key and algorithm.    
     """
+    # Token digest -> verified payload, shared by all instances because the same cookie
+    # is decoded on every request. All access happens on the event loop thread,
+    # so no lock is needed.
+    _decode_cache: TTLCache = TTLCache(maxsize=DECODE_CACHE_SIZE, ttl=DECODE_CACHE_SECONDS)
+
     def __init__(self, logger: CustomLogger = CustomLogger()):
         self._secret_key = os.getenv("JWT_SECRET_KEY")
         self._algorithm = "HS256"
+        self._algorithms = [self._algorithm]
+
+        # Prepare the HMAC key once, so an unusable secret fails here and not per request
+        self._key_bytes = jwt.get_algorithm_by_name(self._algorithm).prepare_key(
+            self._secret_key
+        ) if self._secret_key else None
+        self._cache_key_salt = hashlib.blake2b(self._key_bytes or b"").digest()
         self._access_token_expire_minutes = 60
         self._generate_user_id_obj = GenerateId()
         self._logger = logger
 
-    async def create_jwt(self, data: dict) -> str:
+    def create_jwt(self, data: dict) -> str:
         """
         Generates a JSON Web Token (JWT) containing the provided data and an expiration time.
-        This function copies the input data,
-        adds an expiration timestamp,
-        and encodes it into a JWT using the specified secret key and algorithm.
+        This function adds an expiration timestamp to the input data in place
+        and encodes it into a JWT using the specified secret key and algorithm,
+        so the caller must pass a dict it owns.
             data (dict): The payload data to include in the JWT.
             str: The encoded JWT as a string.
         Raises:
             Exception: If encoding fails due to invalid input or configuration.
         Function Comments:
-            - Copies the input data to avoid mutation.
+            - Sets exp on the input data without copying it.
             - Sets the expiration time based on ACCESS_TOKEN_EXPIRE_MINUTES.
             - Uses SECRET_KEY and ALGORITHM for encoding.
         """
-        to_encode = data.copy()
-        expire = datetime.now(timezone.utc) + timedelta(minutes=self._access_token_expire_minutes)
-        to_encode.update({"exp": expire})
-        return jwt.encode(to_encode, self._secret_key, algorithm=self._algorithm)
+        data["exp"] = datetime.now(timezone.utc) + timedelta(
+            minutes=self._access_token_expire_minutes
+        )
+        return jwt.encode(data, self._key_bytes, algorithm=self._algorithm)
 
-    async def decode_jwt(self, token: Optional[str]) -> Optional[dict]:
+    def decode_jwt(self, token: Optional[str]) -> Optional[dict]:
         """
         Decodes a JWT token using the specified secret key and algorithm.
             token (str): The JWT token string to decode.
@@ -73,12 +92,27 @@ class JWTLibrary:
         """
         if token is None:
             return token
-        try:
-            return jwt.decode(token, self._secret_key, algorithms=[self._algorithm])
-        except JWTError:
+        now = time.time()
+
+        # Key the cache by a digest keyed with the secret, so it does not hold the raw
+        # tokens and tokens verified under another secret never hit
+        cache_key = hashlib.blake2b(
+            token.encode(), digest_size=16, key=self._cache_key_salt
+        ).digest()
+        payload = self._decode_cache.get(cache_key)
+        if payload is None:
+            try:
+                payload = jwt.decode(token, self._key_bytes, algorithms=self._algorithms)
+            except jwt.PyJWTError:
+                return None
+            self._decode_cache[cache_key] = payload
+
+        # A cached payload can outlive its token, so check the expiry again
+        if payload.get("exp", now + 1) <= now:
             return None
+        return payload
 
-    async def generate_jwt_token_schema(self, token: dict, user:dict, tag: str) -> dict:
+    def generate_jwt_token_schema(self, token: dict, user:dict, tag: str) -> dict:
         """
         Generate Schema of JWT Token from token, user, and oauth tag
 
@@ -112,7 +146,7 @@ class JWTLibrary:
         # Returning the Schema
         return token_dict_schema
 
-    async def generate_jwt_from_token(self, token: dict, user: dict, tag: str) -> str:
+    def generate_jwt_from_token(self, token: dict, user: dict, tag: str) -> str:
         """
         Generating JWT token from token, user, and oauth tag
 
@@ -124,7 +158,7 @@ class JWTLibrary:
         Returns:
             str: JWT Encoded String
         """
-        return await self.create_jwt(data=await self.generate_jwt_token_schema(
+        return self.create_jwt(data=self.generate_jwt_token_schema(
             token=token,
             user=user,
             tag=tag
@@ -0,0 +1,36 @@
+"""
+This module provides ASGI middleware for the user service.
+It scopes Starlette's SessionMiddleware to the OAuth routes, so other requests
+skip session cookie parsing and signing.
+"""
+from typing import Any, Sequence
+from starlette.middleware.sessions import SessionMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+class PathScopedSessionMiddleware:
+    """
+    Pure ASGI middleware that runs SessionMiddleware only for requests
+    whose path starts with one of the given prefixes.
+    Usage:
+        app.add_middleware(
+            PathScopedSessionMiddleware,
+            path_prefixes=("/login/", "/auth/"),
+            secret_key=secret_key
+        )
+    """
+    def __init__(self, app: ASGIApp, path_prefixes: Sequence[str], **session_kwargs: Any) -> None:
+        """
+        Args:
+            app (ASGIApp): The wrapped ASGI application.
+            path_prefixes (Sequence[str]): Path prefixes that need the session.
+            session_kwargs (Any): Keyword arguments for SessionMiddleware.
+        """
+        self.app = app
+        self._session_app = SessionMiddleware(app, **session_kwargs)
+        self._path_prefixes = tuple(path_prefixes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] in ("http", "websocket") and scope["path"].startswith(self._path_prefixes):
+            await self._session_app(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
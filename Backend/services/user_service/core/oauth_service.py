@@ -4,26 +4,99 @@ for various providers such as Google, GitHub, and Outlook.
 It includes methods for initiating the OAuth flow, handling callbacks,
 and refreshing tokens when necessary.
 """
+import asyncio
 import os
-from datetime import datetime, timezone
+import time
 from logging import Logger
-from typing import Tuple
+from typing import Optional, Tuple
+import httpx
+import orjson
 from authlib.integrations.starlette_client import OAuth
 from starlette.datastructures import URL
 from fastapi import Request, HTTPException
 from .custom_logger import CustomLogger
 
+# Seconds before cached OIDC discovery metadata is fetched again
+OIDC_DISCOVERY_TTL = int(os.getenv("OIDC_DISCOVERY_TTL", "3600"))
+
+# Seconds before a cached JWKS is fetched again; unknown key IDs always trigger a fetch
+JWKS_TTL = int(os.getenv("JWKS_TTL", "3600"))
+
+# Seconds before expiry at which an access token is already refreshed
+TOKEN_REFRESH_SKEW = int(os.getenv("TOKEN_REFRESH_SKEW", "60"))
+
+# Maximum concurrent calls to the OAuth providers per process
+OAUTH_MAX_INFLIGHT = int(os.getenv("OAUTH_MAX_INFLIGHT", "16"))
+
+# Retries with exponential backoff for idempotent provider API calls
+OAUTH_RETRY_ATTEMPTS = 3
+OAUTH_RETRY_BASE_DELAY = 0.5
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# Timeout and connection limits for calls to the OAuth providers
+OAUTH_HTTP_TIMEOUT = float(os.getenv("OAUTH_HTTP_TIMEOUT", "10"))
+OAUTH_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+
+class SharedTransport(httpx.AsyncBaseTransport):
+    """
+    Connection pool shared by the short-lived OAuth clients Authlib creates per call,
+    so keep-alive connections and TLS sessions to the providers are reused.
+    Closing one of those clients leaves the pool open; close() shuts it down.
+    """
+    def __init__(self, **kwargs):
+        self._transport = httpx.AsyncHTTPTransport(**kwargs)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        """
+        Called when a client using the pool closes; the pool stays open.
+        """
+
+    async def close(self) -> None:
+        """
+        Closes the pooled connections.
+        """
+        await self._transport.aclose()
+
 class OAuthService:
     """
     OAuth Utility
     """
-    def __init__(self, logger: Logger = CustomLogger.setup_logger(__name__)):
-        self._accepted_oauth_tags = set(["google", "github", "outlook"])
+    # OAuth provider tags accepted on the login and auth routes
+    _ACCEPTED_OAUTH_TAGS = frozenset({"google", "github", "outlook"})
+
+    def __init__(self, logger: Optional[Logger] = None):
         self._oauth_obj = OAuth()
-        self._logger = logger
+        self._logger = logger or CustomLogger.setup_logger(__name__)
+        self._http_transport = SharedTransport(limits=OAUTH_HTTP_LIMITS)
+        self._oauth_sem = asyncio.Semaphore(OAUTH_MAX_INFLIGHT)
 
         self._register_oauth()
 
+        # Provider clients and handlers by OAuth tag
+        self._providers = {
+            "google": self._oauth_obj.google,
+            "github": self._oauth_obj.github,
+            "outlook": self._oauth_obj.outlook
+        }
+        self._callback_handlers = {
+            "google": self._callback_openid,
+            "github": self._callback_github,
+            "outlook": self._callback_openid
+        }
+        self._refresh_handlers = {
+            "google": self._refresh_google_access_token,
+            "outlook": self._refresh_outlook_access_token
+        }
+
+        # OpenID providers, whose discovery metadata and signing keys are cached
+        self._oidc_clients = (self._oauth_obj.google, self._oauth_obj.outlook)
+
+        # Provider name -> time its cached JWKS was first seen
+        self._jwks_loaded_at: dict[str, float] = {}
+
     def _register_oauth(self) -> None:
 
         # Register OAuth providers - Google
@@ -36,6 +109,8 @@ class OAuthService:
                 'scope': 'openid email profile',
                 "prompt": "consent",
                 "access_type": "offline",
+                "timeout": OAUTH_HTTP_TIMEOUT,
+                "transport": self._http_transport,
                 }
         )
 
@@ -49,6 +124,8 @@ class OAuthService:
             api_base_url='https://api.github.com/',
             client_kwargs={
                 'scope': 'user:email',
+                'timeout': OAUTH_HTTP_TIMEOUT,
+                'transport': self._http_transport,
                 }
         )
 
@@ -61,11 +138,50 @@ class OAuthService:
             access_token_url='https://login.microsoftonline.com/common/oauth2/v2.0/token',
             client_kwargs={
                 'scope': 'openid email profile offline_access',
-                'validate_iss': False
+                'validate_iss': False,
+                'timeout': OAUTH_HTTP_TIMEOUT,
+                'transport': self._http_transport,
             },
             jwks_uri="https://login.microsoftonline.com/common/discovery/v2.0/keys"
         )
 
+    async def load_server_metadata(self) -> None:
+        """
+        Fetches the OIDC discovery metadata and signing keys of the OpenID providers,
+        so the first login does not wait on them. Authlib keeps both on the client
+        afterwards; call this from the application startup.
+        """
+        self._expire_stale_metadata()
+        for client in self._oidc_clients:
+            await client.load_server_metadata()
+            await client.fetch_jwk_set()
+
+    async def aclose(self) -> None:
+        """
+        Closes the pooled connections to the OAuth providers;
+        call this from the application shutdown.
+        """
+        await self._http_transport.close()
+
+    def _expire_stale_metadata(self) -> None:
+        """
+        Marks discovery metadata older than OIDC_DISCOVERY_TTL as unloaded and drops
+        signing keys older than JWKS_TTL, so Authlib fetches them again on their next use.
+        """
+        now = time.time()
+        for client in self._oidc_clients:
+            metadata = client.server_metadata
+            loaded_at = metadata.get("_loaded_at")
+            if loaded_at and now - loaded_at > OIDC_DISCOVERY_TTL:
+                metadata.pop("_loaded_at")
+
+            # Authlib does not timestamp the JWKS, so its age counts from when it is first seen
+            if "jwks" in metadata:
+                jwks_loaded_at = self._jwks_loaded_at.setdefault(client.name, now)
+                if now - jwks_loaded_at > JWKS_TTL:
+                    metadata.pop("jwks")
+                    del self._jwks_loaded_at[client.name]
+
     async def get_oauth(self, tag: str, request: Request, redirect_uri: URL) -> None:
         """
         
@@ -83,17 +199,14 @@ class OAuthService:
             None: This method performs a redirect and does not return a value.
 
         Raises:
-            None explicitly, but may raise exceptions from the 
-            underlying OAuth library if the tag is invalid
-            or if authorization fails.
+            HTTPException: If the tag is not a supported provider.
+            Exceptions from the underlying OAuth library if authorization fails.
         """
+        # Refresh discovery metadata that has outlived its TTL
+        self._expire_stale_metadata()
+
         # Redirect to the OAuth provider's authorization page
-        if tag == "google":
-            return await self._oauth_obj.google.authorize_redirect(request, redirect_uri)
-        elif tag == "github":
-            return await self._oauth_obj.github.authorize_redirect(request, redirect_uri)
-        elif tag == "outlook":
-            return await self._oauth_obj.outlook.authorize_redirect(request, redirect_uri)
+        return await self._get_provider(tag).authorize_redirect(request, redirect_uri)
 
     async def callback_oauth(self, tag: str, request: Request) -> Tuple[dict, dict]:
         """
@@ -105,7 +218,8 @@ class OAuthService:
             request (Request): The incoming request object containing OAuth callback data.
 
         Raises:
-            Exception: If the OAuth provider is not supported or if authentication fails.
+            HTTPException: If the OAuth provider is not supported.
+            Exception: If authentication fails.
 
         Returns:
             Tuple[dict, dict]: A tuple containing the token dictionary
@@ -116,21 +230,99 @@ class OAuthService:
         # For Google and Outlook, user info is in the token['userinfo']
         # For GitHub, user info is fetched separately using the token
         # Returns both the token and user info as a tuple
-        if tag == "google":
-            token = await self._oauth_obj.google.authorize_access_token(request)
-            user = token['userinfo']
-        elif tag == "github":
-            token = await self._oauth_obj.github.authorize_access_token(request)
-            user = await self._oauth_obj.github.get('user', token=token)
-            user = user.json()
-        elif tag == "outlook":
-            token = await self._oauth_obj.outlook.authorize_access_token(request)
-            user = token['userinfo']
-        return (token, user)
+        self._expire_stale_metadata()
+        client = self._get_provider(tag)
+        return await self._callback_handlers[tag](client, request)
+
+    def _get_provider(self, tag: str):
+        """
+        Returns the registered OAuth client for a provider tag.
+
+        Args:
+            tag (str): The OAuth provider identifier.
+
+        Raises:
+            HTTPException: If the tag is not a supported provider.
+
+        Returns:
+            The Authlib client registered for the provider.
+        """
+        client = self._providers.get(tag)
+        if client is None:
+            raise HTTPException(status_code=400, detail="Invalid OAuth provider tag")
+        return client
+
+    async def _callback_openid(self, client, request: Request) -> Tuple[dict, dict]:
+        """
+        Completes the OAuth flow for OpenID providers, whose token carries the user info.
+
+        Args:
+            client: The Authlib client of the provider.
+            request (Request): The incoming request object containing OAuth callback data.
+
+        Returns:
+            Tuple[dict, dict]: The token dictionary and the user information dictionary.
+        """
+        async with self._oauth_sem:
+            token = await client.authorize_access_token(request)
+        return (token, token['userinfo'])
+
+    async def _callback_github(self, client, request: Request) -> Tuple[dict, dict]:
+        """
+        Completes the OAuth flow for GitHub, fetching the user info with the new token.
+
+        Args:
+            client: The Authlib client of the provider.
+            request (Request): The incoming request object containing OAuth callback data.
+
+        Returns:
+            Tuple[dict, dict]: The token dictionary and the user information dictionary.
+        """
+        async with self._oauth_sem:
+            token = await client.authorize_access_token(request)
+        user = await self._get_with_retry(client, 'user', token=token)
+        return (token, orjson.loads(user.content))
+
+    async def _get_with_retry(self, client, url: str, token: dict) -> httpx.Response:
+        """
+        Calls a provider API with GET, retrying rate limits and server errors
+        with exponential backoff. Only used for idempotent calls; code exchanges
+        and refreshes are not retried, as their grants cannot be replayed.
+
+        Args:
+            client: The Authlib client of the provider.
+            url (str): The API path relative to the provider's base URL.
+            token (dict): The access token to authorize the call with.
+
+        Raises:
+            httpx.HTTPStatusError: If the call still fails after the retries.
+
+        Returns:
+            httpx.Response: The successful response.
+        """
+        for attempt in range(OAUTH_RETRY_ATTEMPTS):
+            async with self._oauth_sem:
+                response = await client.get(url, token=token)
+
+            # Give up on success, on non-retryable errors, or after the last attempt
+            if (response.status_code not in RETRYABLE_STATUS_CODES
+                    or attempt == OAUTH_RETRY_ATTEMPTS - 1):
+                break
+
+            delay = OAUTH_RETRY_BASE_DELAY * 2 ** attempt
+            self._logger.warning(
+                "OAuth provider returned %s for %s, retrying in %ss",
+                response.status_code, url, delay
+            )
+            await asyncio.sleep(delay)
+
+        response.raise_for_status()
+        return response
 
     async def refresh_token(self, tag: str, jwt_token: dict) -> Tuple[dict, dict]:
         """
-        Refreshes the OAuth access token if it has expired.
+        Refreshes the OAuth access token if it has expired
+        or expires within TOKEN_REFRESH_SKEW seconds.
 
         Args:
             tag (str): The OAuth provider tag (e.g., "google", "outlook").
@@ -146,24 +338,26 @@ class OAuthService:
         token = jwt_token.get("token")
         user = jwt_token.get("user")
 
-        # Check if the token is expired
+        # Keep the token while it is valid beyond the skew window
         expires_at = token.get("expires_at")
-        if expires_at and datetime.now(tz=timezone.utc).timestamp() > expires_at:
-
-            # If the token is expired, refresh it based on the OAuth provider
-            if "refresh_token" not in token:
-                raise HTTPException(
-                    status_code=401,
-                    detail="Token expired and no refresh token available"
-                )
-
-            # Refresh the token based on the OAuth provider
-            if tag == "google":
-                token = await self._refresh_google_access_token(token)
-                user = dict(token).get("userinfo")
-            elif tag == "outlook":
-                token = await self._refresh_outlook_access_token(token)
-                user = dict(token).get("userinfo")
+        now = time.time()
+        if not expires_at or now + TOKEN_REFRESH_SKEW < expires_at:
+            return (token, user)
+
+        # Without a refresh token, an expiring token stays usable until it has expired
+        if "refresh_token" not in token:
+            if expires_at > now:
+                return (token, user)
+            raise HTTPException(
+                status_code=401,
+                detail="Token expired and no refresh token available"
+            )
+
+        # Refresh the token based on the OAuth provider
+        refresh_handler = self._refresh_handlers.get(tag)
+        if refresh_handler is not None:
+            token = await refresh_handler(token)
+            user = token.get("userinfo")
 
         return (token, user)
 
@@ -186,18 +380,19 @@ class OAuthService:
             raise HTTPException(status_code=401, detail="No refresh token available")
 
         # Generate a new access token using the refresh token
-        new_token = await self._oauth_obj.google.refresh_token(
-            url='https://oauth2.googleapis.com/token',
-            refresh_token=token['refresh_token']
-        )
+        async with self._oauth_sem:
+            new_token = await self._oauth_obj.google.refresh_token(
+                url='https://oauth2.googleapis.com/token',
+                refresh_token=token['refresh_token']
+            )
 
         # Log the new token information
-        self._logger.debug(f"New token: {new_token}")
+        self._logger.debug("New token: %s", new_token)
 
         # Return the new token
         return new_token
 
-    async def is_valid_oauth_tag(self, tag: str) -> bool:
+    def is_valid_oauth_tag(self, tag: str) -> bool:
         """
         Validate Oauth Tab by returning True False
 
@@ -207,7 +402,7 @@ class OAuthService:
         Returns:
             bool: True in case of accpetance, False otherwise.
         """
-        return tag in self._accepted_oauth_tags
+        return tag in self._ACCEPTED_OAUTH_TAGS
 
     async def _refresh_outlook_access_token(self, token: dict) -> dict:
         """
@@ -227,9 +422,10 @@ class OAuthService:
             raise HTTPException(status_code=401, detail="No refresh token available")
 
         # Refresh token using Microsoft identity platform
-        new_token = await self._oauth_obj.outlook.refresh_token(
-            url='https://login.microsoftonline.com/common/oauth2/v2.0/token',
-            refresh_token=token['refresh_token']
-        )
+        async with self._oauth_sem:
+            new_token = await self._oauth_obj.outlook.refresh_token(
+                url='https://login.microsoftonline.com/common/oauth2/v2.0/token',
+                refresh_token=token['refresh_token']
+            )
 
         return new_token
\ No newline at end of file
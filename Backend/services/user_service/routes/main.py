@@ -4,17 +4,19 @@ like Google, GitHub, and Outlook. It includes endpoints for login and authentica
 middleware for session management and CORS, and integrates JWT for secure token handling.
 """
 # ----------------------------- Importing Required Libraries -----------------------------
+import logging
 import os
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request, HTTPException, Response
+from fastapi import APIRouter, BackgroundTasks, FastAPI, Request, HTTPException, Response
+from fastapi.middleware import Middleware
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse, JSONResponse
-from starlette.middleware.sessions import SessionMiddleware
 from core.custom_logger import CustomLogger
 from core.generate_id import GenerateId
 from core.database_connection import AsyncSQLAlchemySingleton
 from core.jwt_lib import JWTLibrary
 from core.oauth_service import OAuthService
+from core.middleware import PathScopedSessionMiddleware
 
 # ----------------------------- Initializing the environment -----------------------------
 # Startup and shutdown events for the FastAPI application
@@ -27,32 +29,38 @@ async def lifespan(app_object: FastAPI):
     db.init_engine()
     await db.create_schema_if_not_exists()
     app_object.state.db = db
+
+    # Preload OIDC discovery metadata; if the provider is unreachable it is fetched on first use
+    try:
+        await oauth_service.load_server_metadata()
+    except Exception as e:
+        logger.warning("Could not preload OIDC metadata: %s", e)
     yield
-    # NOTE: Cleanup can be added here if needed
+
+    # Close the pooled connections to the OAuth providers
+    await oauth_service.aclose()
 
 # Initialize the logger
 logger = CustomLogger.setup_logger(__name__)
 
-# Initialize the FastAPI application
-app = FastAPI(lifespan=lifespan)
-
-# Initialize the session middleware
-app.add_middleware(
-    SessionMiddleware,
-    secret_key = os.getenv("SESSION_SECRET"),
-    same_site = "lax"
-    # https_only = True # NOTE: Turn it on in Production
-)
+# Settings read once from the environment
+REDIRECT_URL = os.getenv("REDIRECT_URL_AFTER_OAUTH")
+SESSION_SECRET = os.getenv("SESSION_SECRET")
+HTTPS_ONLY = os.getenv("HTTPS_ONLY", "false").lower() in frozenset({"true", "1", "yes"})
 
-# CORS middleware to allow cross-origin requests
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+# Comma-separated origins allowed to call the API with credentials; "*" is not allowed
+ALLOW_ORIGINS = tuple(
+    origin.strip()
+    for origin in os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
+    if origin.strip()
 )
 
+# Browsers do not store cookies above 4 KB, so longer access tokens are never genuine
+MAX_ACCESS_TOKEN_LENGTH = 4096
+
+# Router holding the API endpoints, mounted on the application by create_app()
+router = APIRouter()
+
 # Initialize the oauth client
 oauth_service = OAuthService(logger=logger)
 
@@ -64,7 +72,7 @@ generate_user_id_utility = GenerateId(logger=logger)
 
 # ----------------------------- API Endpoints -----------------------------
 # Endpoint to handle OAuth login
-@app.get("/login/{tag}")
+@router.get("/login/{tag}")
 async def login(tag: str, request: Request):
     """
     Redirect the user to the Google OAuth login page.
@@ -76,18 +84,18 @@ async def login(tag: str, request: Request):
         RedirectResponse: A redirect to the Google OAuth login page.
     """
     # Validate the tag
-    if not await oauth_service.is_valid_oauth_tag(tag=tag):
+    if not oauth_service.is_valid_oauth_tag(tag=tag):
         raise HTTPException(status_code=400, detail="Invalid OAuth provider tag")
 
     # Log the login attempt
     logger.debug("Login request received")
-    logger.debug(f"Request: {request}")
+    logger.debug("Request: %s", request)
 
     # Generate the redirect URI
     redirect_uri = request.url_for('auth', tag=tag)
 
     # Log the redirect URI
-    logger.debug(f"Redirect URI: {redirect_uri}")
+    logger.debug("Redirect URI: %s", redirect_uri)
 
     return await oauth_service.get_oauth(
         tag=tag,
@@ -95,13 +103,19 @@ async def login(tag: str, request: Request):
         redirect_uri=redirect_uri)
 
 # Endpoint to handle OAuth authentication callback
-@app.get("/auth/{tag}")
-async def auth(tag: str, request: Request, response: Response):
+@router.get("/auth/{tag}")
+async def auth(
+        tag: str,
+        request: Request,
+        response: Response,
+        background_tasks: BackgroundTasks
+    ):
     """
     Authenticate the user using Google OAuth.
     
     Args:
         request (Request): The incoming request object.
+        background_tasks (BackgroundTasks): Tasks run after the response is sent.
     
     Returns:
         JSONResponse: A response indicating the authentication status.
@@ -111,18 +125,19 @@ async def auth(tag: str, request: Request, response: Response):
 
     token, user = await oauth_service.callback_oauth(tag=tag, request=request)
 
-    # Log the token and user information
-    logger.debug(f"token: {token}")
-    logger.debug(f"User authenticated: {dict(user)}")
+    # Log the token and user information, rendering them only when DEBUG is on
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("token: %s", token)
+        logger.debug("User authenticated: %s", user)
 
     # Setting JWT Token in cookies
     redirect_response = RedirectResponse(
-        url=os.getenv("REDIRECT_URL_AFTER_OAUTH"),
+        url=REDIRECT_URL,
         status_code=307
     )
 
     # JWT Token generation and setting in cookies
-    cookie = await jwt_auth.generate_jwt_from_token(
+    cookie = jwt_auth.generate_jwt_from_token(
             token=token,
             user=user,
             tag=tag
@@ -132,26 +147,27 @@ async def auth(tag: str, request: Request, response: Response):
         key="access_token",
         value=cookie,
         httponly=True,
-        secure=False,
+        secure=HTTPS_ONLY,
         samesite="lax",
         path="/"
     )
 
     # Log the response cookie
-    logger.debug(f"Response cookie set: {cookie}")
+    logger.debug("Response cookie set: %s", cookie)
 
 
-    # Database Entry for User
-    await generate_user_id_utility.create_user(
+    # Database Entry for User, written after the redirect has been sent
+    background_tasks.add_task(
+        generate_user_id_utility.create_user,
         name=user.get("name"),
         email=user.get("email"),
-        db_connection=app.state.db
+        db_connection=request.app.state.db
     )
 
     return redirect_response
 
 # Endpoint to handle status calls on start
-@app.get("/status")
+@router.get("/status")
 async def get_status(request: Request):
     """
     Send Name and Email Details if Logged In
@@ -172,15 +188,56 @@ async def get_status(request: Request):
         logger.warning("No Access Token found in requests!")
         return JSONResponse({"name": "Guest"})
 
+    # Skip verification for cookies that cannot be a JWT (three dot-separated parts)
+    if token.count(".") != 2 or len(token) > MAX_ACCESS_TOKEN_LENGTH:
+        logger.warning("Malformed Access Token found in requests!")
+        return JSONResponse({"name": "Guest"})
+
     try:
-        payload = await jwt_auth.decode_jwt(token)
+        payload = jwt_auth.decode_jwt(token)
         name = payload.get("name")
         email = payload.get("email")
         if not name or not email:
-            logger.warning(f"Name: {name} or email: {email} missing!")
+            logger.warning("Name: %s or email: %s missing!", name, email)
             return JSONResponse({"name": name or "Guest"})
-        logger.debug(f"Extracted Name: {name} and Email: {email} from access token")
+        logger.debug("Extracted Name: %s and Email: %s from access token", name, email)
         return JSONResponse({"name": name, "email": email})
     except Exception as e:
-        logger.error(f"JWT decode error: {e}")
+        logger.error("JWT decode error: %s", e)
         return JSONResponse({"name": "Guest"})
+
+# ----------------------------- Application Factory -----------------------------
+def create_app() -> FastAPI:
+    """
+    Create the FastAPI application with its middleware and API endpoints.
+
+    Returns:
+        FastAPI: The configured application.
+    """
+    # Middleware is passed to the constructor so the stack is built once; the first
+    # entry is the outermost layer
+    middleware = [
+        # CORS middleware to allow cross-origin requests
+        Middleware(
+            CORSMiddleware,
+            allow_origins=ALLOW_ORIGINS,
+            allow_credentials=True,
+            allow_methods=["*"],
+            allow_headers=["*"],
+        ),
+        # Session middleware, only for the OAuth routes that keep state in it
+        Middleware(
+            PathScopedSessionMiddleware,
+            path_prefixes=("/login/", "/auth/"),
+            secret_key = SESSION_SECRET,
+            same_site = "lax",
+            https_only = HTTPS_ONLY # NOTE: Turn it on in Production
+        ),
+    ]
+
+    app_object = FastAPI(lifespan=lifespan, middleware=middleware)
+    app_object.include_router(router)
+    return app_object
+
+# Initialize the FastAPI application
+app = create_app()
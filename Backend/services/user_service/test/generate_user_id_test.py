@@ -1,6 +1,8 @@
 # Test suite for GenerateId class
 import hashlib
+import pytest
 from Backend.services.bdoc_generator_sql_service.core.generate_id import GenerateId
+from Backend.services.user_service.core.generate_id import GenerateId as UserServiceGenerateId
 
 
 def test_generate_user_id_with_email():
@@ -29,6 +31,23 @@ def test_generate_user_id_without_email():
     assert result == expected
 
 
+@pytest.mark.parametrize("generator_cls", [GenerateId, UserServiceGenerateId])
+def test_generate_user_id_matches_string_normalization(generator_cls):
+    """
+    Test that ASCII and non-ASCII inputs hash as if normalized as strings,
+    in both the bdoc and the user service implementations.
+    """
+    generator = generator_cls()
+    for name, email in [
+        (" Alice\x1c", "ALICE@Example.com\t"),
+        ("Zoë Ångström ", " zoe@example.com"),
+        ("Bob\u00a0", "bob@example.com"),
+    ]:
+        expected = hashlib.sha256(
+            f"{name.lower().strip()}|{email.lower().strip()}".encode("utf-8")).hexdigest()
+        assert generator.generate_user_id(name, email) == expected
+
+
 def test_generate_request_id():
     """
     Test generating a request ID based on SQL script and business name.
@@ -1,7 +1,8 @@
 # Test suite for JWTLibrary class
+import time
 from unittest.mock import MagicMock, patch
 from datetime import datetime, timedelta, timezone
-from jose import jwt
+import jwt
 import pytest
 from core.jwt_lib import JWTLibrary
 
@@ -31,8 +32,7 @@ def jwt_lib(mock_generate_id):
     with patch("core.jwt_lib.GenerateId", return_value=mock_generate_id):
         return JWTLibrary(logger=MagicMock())
 
-@pytest.mark.asyncio
-async def test_create_and_decode_jwt(jwt_lib: JWTLibrary):
+def test_create_and_decode_jwt(jwt_lib: JWTLibrary):
     """
     Test creating and decoding a JWT token.
 
@@ -40,33 +40,30 @@ async def test_create_and_decode_jwt(jwt_lib: JWTLibrary):
         jwt_lib (JWTLibrary): Instance of JWTLibrary to test.
     """
     payload = {"user_id": 123}
-    token = await jwt_lib.create_jwt(payload)
-    decoded = await jwt_lib.decode_jwt(token)
+    token = jwt_lib.create_jwt(payload)
+    decoded = jwt_lib.decode_jwt(token)
     assert decoded["user_id"] == 123
     assert "exp" in decoded
 
-@pytest.mark.asyncio
-async def test_decode_jwt_none(jwt_lib: JWTLibrary):
+def test_decode_jwt_none(jwt_lib: JWTLibrary):
     """
     Test decoding a None token.
 
     Args:
         jwt_lib (JWTLibrary): Instance of JWTLibrary to test.
     """
-    assert await jwt_lib.decode_jwt(None) is None
+    assert jwt_lib.decode_jwt(None) is None
 
-@pytest.mark.asyncio
-async def test_decode_jwt_invalid(jwt_lib: JWTLibrary):
+def test_decode_jwt_invalid(jwt_lib: JWTLibrary):
     """
     Test decoding an invalid JWT token.
 
     Args:
         jwt_lib (JWTLibrary): Instance of JWTLibrary to test.
     """
-    assert await jwt_lib.decode_jwt("invalid_token") is None
+    assert jwt_lib.decode_jwt("invalid_token") is None
 
-@pytest.mark.asyncio
-async def test_decode_jwt_expired(jwt_lib: JWTLibrary):
+def test_decode_jwt_expired(jwt_lib: JWTLibrary):
     """
     Test decoding an expired JWT token.
 
@@ -79,10 +76,9 @@ async def test_decode_jwt_expired(jwt_lib: JWTLibrary):
     }
     token = jwt.encode(
         expired_payload, jwt_lib._secret_key, algorithm=jwt_lib._algorithm)
-    assert await jwt_lib.decode_jwt(token) is None
+    assert jwt_lib.decode_jwt(token) is None
 
-@pytest.mark.asyncio
-async def test_generate_jwt_token_schema(jwt_lib: JWTLibrary, mock_generate_id):
+def test_generate_jwt_token_schema(jwt_lib: JWTLibrary, mock_generate_id):
     """
     Test generating JWT token schema.
 
@@ -92,14 +88,13 @@ async def test_generate_jwt_token_schema(jwt_lib: JWTLibrary, mock_generate_id):
     """
     token = {"access": "abc"}
     user = {"name": "John Doe", "email": "john@example.com"}
-    schema = await jwt_lib.generate_jwt_token_schema(token, user, "Google")
+    schema = jwt_lib.generate_jwt_token_schema(token, user, "Google")
     assert schema["name"] == "John Doe"
     assert schema["email"] == "john@example.com"
     assert schema["user_id"] == "mock_user_id"
     assert schema["oauth_tag"] == "Google"
 
-@pytest.mark.asyncio
-async def test_generate_jwt_from_token(jwt_lib: JWTLibrary):
+def test_generate_jwt_from_token(jwt_lib: JWTLibrary):
     """
     Test generating JWT from token, user, and tag.
 
@@ -108,8 +103,23 @@ async def test_generate_jwt_from_token(jwt_lib: JWTLibrary):
     """
     token = {"access": "abc"}
     user = {"name": "John Doe", "email": "john@example.com"}
-    jwt_token = await jwt_lib.generate_jwt_from_token(token, user, "Github")
-    decoded = await jwt_lib.decode_jwt(jwt_token)
+    jwt_token = jwt_lib.generate_jwt_from_token(token, user, "Github")
+    decoded = jwt_lib.decode_jwt(jwt_token)
     assert decoded.get("oauth_tag") == "Github"
     assert decoded.get("name") == "John Doe"
     assert decoded.get("email") == "john@example.com"
+
+def test_decode_jwt_cached_token_expires(jwt_lib: JWTLibrary):
+    """
+    Test that a cached payload is rejected once its token expires.
+
+    Args:
+        jwt_lib (JWTLibrary): Instance of JWTLibrary to test.
+    """
+    expire = int(time.time()) + 3600
+    token = jwt.encode(
+        {"user_id": 123, "exp": expire}, jwt_lib._secret_key, algorithm=jwt_lib._algorithm)
+    with patch("core.jwt_lib.time.time", return_value=expire - 5):
+        assert jwt_lib.decode_jwt(token)["user_id"] == 123
+    with patch("core.jwt_lib.time.time", return_value=expire + 5):
+        assert jwt_lib.decode_jwt(token) is None
@@ -0,0 +1,58 @@
+# Test suite for PathScopedSessionMiddleware class
+import unittest
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+from core.middleware import PathScopedSessionMiddleware
+
+async def session_state(request: Request) -> JSONResponse:
+    """
+    Reports whether the request carries a session.
+    """
+    has_session = "session" in request.scope
+    if has_session:
+        request.session["visited"] = True
+    return JSONResponse({"has_session": has_session})
+
+class TestPathScopedSessionMiddleware(unittest.TestCase):
+    """
+    Test suite for PathScopedSessionMiddleware class.
+
+    Args:
+        unittest.TestCase: Base class for test cases.
+    """
+
+    def setUp(self):
+        app = Starlette(routes=[
+            Route("/login/{tag}", session_state),
+            Route("/status", session_state),
+        ])
+        app.add_middleware(
+            PathScopedSessionMiddleware,
+            path_prefixes=("/login/",),
+            secret_key="test-secret"
+        )
+        self.client = TestClient(app)
+
+    def test_session_on_scoped_path(self):
+        """
+        Test that scoped paths get a session and a session cookie.
+        """
+        response = self.client.get("/login/google")
+
+        self.assertTrue(response.json()["has_session"])
+        self.assertIn("session", response.cookies)
+
+    def test_no_session_on_other_paths(self):
+        """
+        Test that other paths skip the session middleware entirely.
+        """
+        response = self.client.get("/status")
+
+        self.assertFalse(response.json()["has_session"])
+        self.assertNotIn("session", response.cookies)
+
+if __name__ == '__main__':
+    unittest.main()
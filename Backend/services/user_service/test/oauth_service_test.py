@@ -0,0 +1,178 @@
+# Test suite for OAuthService class
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+import pytest
+from fastapi import HTTPException
+from core.oauth_service import (
+    JWKS_TTL, OIDC_DISCOVERY_TTL, TOKEN_REFRESH_SKEW, OAuthService
+)
+
+@pytest.fixture
+def oauth_service():
+    """
+    Fixture to create an instance of OAuthService with a mocked logger.
+
+    Returns:
+        OAuthService: An instance of OAuthService.
+    """
+    return OAuthService(logger=MagicMock())
+
+@pytest.mark.asyncio
+async def test_load_server_metadata(oauth_service: OAuthService):
+    """
+    Test that discovery metadata and signing keys are loaded for the OpenID providers.
+
+    Args:
+        oauth_service (OAuthService): Instance of OAuthService to test.
+    """
+    clients = (oauth_service._oauth_obj.google, oauth_service._oauth_obj.outlook)
+    for client in clients:
+        client.load_server_metadata = AsyncMock()
+        client.fetch_jwk_set = AsyncMock()
+
+    await oauth_service.load_server_metadata()
+
+    for client in clients:
+        client.load_server_metadata.assert_awaited_once()
+        client.fetch_jwk_set.assert_awaited_once()
+
+def test_expire_stale_metadata(oauth_service: OAuthService):
+    """
+    Test that only metadata older than the TTL is marked for reloading.
+
+    Args:
+        oauth_service (OAuthService): Instance of OAuthService to test.
+    """
+    metadata = oauth_service._oauth_obj.google.server_metadata
+
+    metadata["_loaded_at"] = time.time()
+    oauth_service._expire_stale_metadata()
+    assert "_loaded_at" in metadata
+
+    metadata["_loaded_at"] = time.time() - OIDC_DISCOVERY_TTL - 1
+    oauth_service._expire_stale_metadata()
+    assert "_loaded_at" not in metadata
+
+def test_expire_stale_jwks(oauth_service: OAuthService):
+    """
+    Test that a cached JWKS is dropped once it is older than the TTL.
+
+    Args:
+        oauth_service (OAuthService): Instance of OAuthService to test.
+    """
+    metadata = oauth_service._oauth_obj.outlook.server_metadata
+    metadata["jwks"] = {"keys": []}
+
+    now = time.time()
+    with patch("core.oauth_service.time.time", return_value=now):
+        oauth_service._expire_stale_metadata()
+    assert "jwks" in metadata
+
+    with patch("core.oauth_service.time.time", return_value=now + JWKS_TTL + 1):
+        oauth_service._expire_stale_metadata()
+    assert "jwks" not in metadata
+
+@pytest.mark.asyncio
+async def test_shared_transport_outlives_clients(oauth_service: OAuthService):
+    """
+    Test that closing a provider client keeps the shared connection pool open
+    until the service itself is closed.
+
+    Args:
+        oauth_service (OAuthService): Instance of OAuthService to test.
+    """
+    transport = oauth_service._http_transport
+    with patch.object(transport._transport, "aclose", new_callable=AsyncMock) as mock_close:
+        client = oauth_service._oauth_obj.github._get_oauth_client()
+        async with client:
+            assert client._transport is transport
+        mock_close.assert_not_awaited()
+
+        await oauth_service.aclose()
+        mock_close.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_refresh_token_within_skew(oauth_service: OAuthService):
+    """
+    Test that tokens are only refreshed once they are inside the skew window.
+
+    Args:
+        oauth_service (OAuthService): Instance of OAuthService to test.
+    """
+    user = {"name": "John Doe"}
+    new_token = {"access_token": "new", "userinfo": {"name": "Jane Doe"}}
+    mock_refresh = AsyncMock(return_value=new_token)
+    with patch.dict(oauth_service._refresh_handlers, {"google": mock_refresh}):
+        token = {"expires_at": time.time() + TOKEN_REFRESH_SKEW + 60, "refresh_token": "r"}
+        assert await oauth_service.refresh_token(
+            "google", {"token": token, "user": user}) == (token, user)
+        mock_refresh.assert_not_awaited()
+
+        token = {"expires_at": time.time() + TOKEN_REFRESH_SKEW - 10, "refresh_token": "r"}
+        assert await oauth_service.refresh_token(
+            "google", {"token": token, "user": user}) == (new_token, new_token["userinfo"])
+        mock_refresh.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_refresh_token_without_refresh_token(oauth_service: OAuthService):
+    """
+    Test that a token without a refresh token stays usable inside the skew window
+    and is rejected once it has expired.
+
+    Args:
+        oauth_service (OAuthService): Instance of OAuthService to test.
+    """
+    user = {"name": "John Doe"}
+    token = {"expires_at": time.time() + TOKEN_REFRESH_SKEW - 10}
+    assert await oauth_service.refresh_token(
+        "google", {"token": token, "user": user}) == (token, user)
+
+    token = {"expires_at": time.time() - 1}
+    with pytest.raises(HTTPException) as exc_info:
+        await oauth_service.refresh_token("google", {"token": token, "user": user})
+    assert exc_info.value.status_code == 401
+
+def test_is_valid_oauth_tag(oauth_service: OAuthService):
+    """
+    Test validating OAuth provider tags.
+
+    Args:
+        oauth_service (OAuthService): Instance of OAuthService to test.
+    """
+    assert oauth_service.is_valid_oauth_tag("github")
+    assert not oauth_service.is_valid_oauth_tag("facebook")
+
+@pytest.mark.asyncio
+async def test_callback_oauth_github(oauth_service: OAuthService):
+    """
+    Test that the GitHub callback fetches the user with the new token.
+
+    Args:
+        oauth_service (OAuthService): Instance of OAuthService to test.
+    """
+    token = {"access_token": "abc"}
+    user_response = MagicMock(status_code=200, content=b'{"name": "John Doe"}')
+    github = oauth_service._oauth_obj.github
+    with patch.object(github, "authorize_access_token", new_callable=AsyncMock,
+                      return_value=token), \
+            patch.object(github, "get", new_callable=AsyncMock,
+                         return_value=user_response) as mock_get:
+        result = await oauth_service.callback_oauth("github", MagicMock())
+    assert result == (token, {"name": "John Doe"})
+    mock_get.assert_awaited_once_with("user", token=token)
+
+@pytest.mark.asyncio
+async def test_get_with_retry_retries_server_errors(oauth_service: OAuthService):
+    """
+    Test that provider API calls are retried on server errors until they succeed.
+
+    Args:
+        oauth_service (OAuthService): Instance of OAuthService to test.
+    """
+    client = MagicMock()
+    client.get = AsyncMock(side_effect=[MagicMock(status_code=503), MagicMock(status_code=200)])
+    with patch("core.oauth_service.asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+        response = await oauth_service._get_with_retry(client, "user", token={})
+    assert response.status_code == 200
+    assert client.get.await_count == 2
+    mock_sleep.assert_awaited_once()